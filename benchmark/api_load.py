@@ -0,0 +1,92 @@
+"""
+jx3api请求的压力测试，模拟多个群同时查询，统计延迟和实际请求数。
+
+先启动模拟服务器`benchmark/stub_server.py`，然后在项目根目录下运行：
+```
+python benchmark/api_load.py --url http://127.0.0.1:5700 --groups 500 --rounds 5
+```
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+import nonebot
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+QUERIES = [
+    ("data_active_current", "server"),
+    ("data_trade_demon", "server"),
+    ("data_server_check", "server"),
+    ("data_rank_various", "server"),
+]
+"""模拟的查询，接口名和需要的参数"""
+
+
+def percentile(values: list[float], percent: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, int(len(values) * percent / 100))
+    return values[index]
+
+
+async def run(args: argparse.Namespace):
+    from src.internal.jx3api import RANK_VARIOUS_TYPES, SERVER_DICT, JX3API
+
+    api = JX3API()
+    servers = list(SERVER_DICT)
+    latencies: list[float] = []
+    failed = 0
+
+    async def one_query():
+        nonlocal failed
+        name, _ = random.choice(QUERIES)
+        params = {"server": random.choice(servers)}
+        if name == "data_rank_various":
+            params["type"] = random.choice(RANK_VARIOUS_TYPES)
+        time_start = time.perf_counter()
+        response = await getattr(api, name)(**params)
+        latencies.append(time.perf_counter() - time_start)
+        if response.code != 200:
+            failed += 1
+
+    time_start = time.perf_counter()
+    for _ in range(args.rounds):
+        await asyncio.gather(*(one_query() for _ in range(args.groups)))
+    elapsed = time.perf_counter() - time_start
+
+    total = len(latencies)
+    print(f"查询 {total} 次，耗时 {elapsed:.2f} 秒，{total / elapsed:.1f} 次/秒")
+    print(
+        f"延迟 p50：{percentile(latencies, 50) * 1000:.1f}ms，"
+        f"p99：{percentile(latencies, 99) * 1000:.1f}ms，"
+        f"最大：{max(latencies) * 1000:.1f}ms"
+    )
+    print(f"失败：{failed}，实际请求：{api.requested}，合并：{api.coalesced}")
+    print(
+        f"缓存命中：{api.cache.hits}，旧数据：{api.cache.stale_hits}，"
+        f"未命中：{api.cache.misses}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="jx3api压力测试")
+    parser.add_argument("--url", default="http://127.0.0.1:5700", help="api地址")
+    parser.add_argument("--groups", type=int, default=200, help="每轮并发查询数")
+    parser.add_argument("--rounds", type=int, default=5, help="轮数")
+    parser.add_argument("--no-cache", action="store_true", help="关闭接口缓存")
+    args = parser.parse_args()
+
+    os.environ["jx3api_url"] = args.url
+    os.environ["jx3api_cache"] = "false" if args.no_cache else "true"
+    nonebot.init()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
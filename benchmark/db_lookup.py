@@ -0,0 +1,88 @@
+"""
+数据库查询的性能测试，对比user_info表有无(group_id, user_id)唯一索引时，
+按用户查询的耗时随表大小的变化。
+
+直接使用sqlite3建表，不需要启动机器人，在项目根目录下运行：
+```
+python benchmark/db_lookup.py --sizes 10000 100000 1000000
+```
+"""
+
+import argparse
+import random
+import sqlite3
+import time
+
+CREATE_TABLE = """
+CREATE TABLE "user_info" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "group_id" INT NOT NULL,
+    "user_id" INT NOT NULL,
+    "user_name" VARCHAR(255) NOT NULL DEFAULT '',
+    "gold" INT NOT NULL DEFAULT 0
+)
+"""
+"""与UserInfo模型相同的主要字段"""
+
+CREATE_INDEX = """
+CREATE UNIQUE INDEX "uid_user_info_group_id_user_id" ON "user_info" ("group_id", "user_id")
+"""
+
+LOOKUP = 'SELECT * FROM "user_info" WHERE "user_id" = ? AND "group_id" = ? LIMIT 2'
+"""与get_or_create相同的查询"""
+
+
+def create_table(size: int, members: int, indexed: bool) -> sqlite3.Connection:
+    """创建内存数据库，每个群members个成员，共size条记录"""
+    connection = sqlite3.connect(":memory:")
+    connection.execute(CREATE_TABLE)
+    rows = (
+        (100000 + index // members, 10000000 + index % members, f"用户{index}")
+        for index in range(size)
+    )
+    connection.executemany(
+        'INSERT INTO "user_info" ("group_id", "user_id", "user_name") VALUES (?, ?, ?)',
+        rows,
+    )
+    if indexed:
+        connection.execute(CREATE_INDEX)
+    connection.commit()
+    return connection
+
+
+def run(connection: sqlite3.Connection, size: int, members: int, number: int) -> float:
+    """随机查询number次，返回每次查询的平均耗时"""
+    groups = max(1, size // members)
+    keys = [
+        (10000000 + random.randrange(members), 100000 + random.randrange(groups))
+        for _ in range(number)
+    ]
+    time_start = time.perf_counter()
+    for key in keys:
+        connection.execute(LOOKUP, key).fetchall()
+    return (time.perf_counter() - time_start) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="user_info查询性能测试")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="表大小"
+    )
+    parser.add_argument("--members", type=int, default=2000, help="每个群的成员数")
+    parser.add_argument("--number", type=int, default=200, help="每项查询次数")
+    args = parser.parse_args()
+
+    print(f"{'记录数':>10}{'无索引':>14}{'唯一索引':>14}{'倍数':>10}")
+    for size in args.sizes:
+        plain = run(create_table(size, args.members, False), size, args.members, args.number)
+        indexed = run(
+            create_table(size, args.members, True), size, args.members, args.number * 10
+        )
+        print(
+            f"{size:>10}{plain * 1e6:>12.1f}us{indexed * 1e6:>12.1f}us"
+            f"{plain / indexed:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+jx3api返回数据解析的性能测试，对比pydantic校验解析和快速解析。
+
+在项目根目录下运行：
+```
+python benchmark/decode_response.py
+```
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+import nonebot
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+nonebot.init()
+
+from src.internal.jx3api import decode_response, json_loads  # noqa: E402
+
+FIXTURES = Path(__file__).parent / "fixtures"
+NUMBER = 2000
+
+
+def main():
+    print(f"json解析：{json_loads.__module__}，每项 {NUMBER} 次")
+    print(f"{'payload':<24}{'大小':>10}{'pydantic':>14}{'fast':>14}{'倍数':>8}")
+    for path in sorted(FIXTURES.glob("*.json")):
+        content = path.read_bytes()
+        # 两种解析结果需要一致
+        assert decode_response(content, fast=False) == decode_response(content)
+        slow = timeit.timeit(lambda: decode_response(content, fast=False), number=NUMBER)
+        fast = timeit.timeit(lambda: decode_response(content), number=NUMBER)
+        print(
+            f"{path.stem:<24}{len(content):>10}"
+            f"{slow / NUMBER * 1e6:>12.1f}us{fast / NUMBER * 1e6:>12.1f}us"
+            f"{slow / fast:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+bot连接时注册群成员的性能测试，对比逐个user_init和批量bulk_user_init的耗时。
+
+使用临时的sqlite数据库，参数与机器人相同，不需要启动机器人，在项目根目录下运行：
+```
+python benchmark/member_register.py --groups 50 --members 2000
+```
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from tortoise import Tortoise
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.modules.user_info import UserInfo  # noqa: E402
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
+}
+"""与默认数据库设置相同的参数"""
+
+
+async def init_database(path: Path):
+    """初始化临时数据库"""
+    config = {
+        "connections": {
+            "default": {
+                "engine": "tortoise.backends.sqlite",
+                "credentials": {"file_path": str(path), **PRAGMAS},
+            }
+        },
+        "apps": {
+            "models": {"models": ["src.modules.user_info"], "default_connection": "default"}
+        },
+    }
+    await Tortoise.init(config=config)
+    await Tortoise.generate_schemas()
+
+
+def make_members(groups: int, members: int) -> dict[int, dict[int, str]]:
+    """生成群成员，相邻的群有一半成员相同"""
+    return {
+        100000 + group: {
+            10000000 + group * members // 2 + index: f"用户{index}"
+            for index in range(members)
+        }
+        for group in range(groups)
+    }
+
+
+async def register_one_by_one(data: dict[int, dict[int, str]]):
+    """原来的注册方式，逐个user_init"""
+    for group_id, users in data.items():
+        for user_id, user_name in users.items():
+            await UserInfo.user_init(user_id, group_id, user_name)
+
+
+async def register_bulk(data: dict[int, dict[int, str]], concurrency: int):
+    """批量注册，多个群同时进行"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def register(group_id: int, users: dict[int, str]):
+        async with semaphore:
+            await UserInfo.bulk_user_init(group_id, users)
+
+    await asyncio.gather(*(register(group_id, users) for group_id, users in data.items()))
+
+
+async def measure(name: str, func, data: dict[int, dict[int, str]], **kwargs) -> float:
+    """在新的数据库中运行两次，第一次为新注册，第二次为重启后刷新昵称"""
+    with tempfile.TemporaryDirectory() as path:
+        await init_database(Path(path) / "data.db")
+        try:
+            results = []
+            for _ in range(2):
+                time_start = time.perf_counter()
+                await func(data, **kwargs)
+                results.append(time.perf_counter() - time_start)
+            count = await UserInfo.all().count()
+        finally:
+            await Tortoise.close_connections()
+    print(f"{name:<12}首次：{results[0]:>8.2f}秒，重启：{results[1]:>8.2f}秒，记录数：{count}")
+    return results[0]
+
+
+async def run(args: argparse.Namespace):
+    data = make_members(args.groups, args.members)
+    total = sum(len(users) for users in data.values())
+    print(f"{args.groups} 个群，共 {total} 名成员")
+    bulk = await measure("批量注册", register_bulk, data, concurrency=args.concurrency)
+    if args.skip_old:
+        return
+    old = await measure("逐个注册", register_one_by_one, data)
+    print(f"首次注册快 {old / bulk:.1f} 倍")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="群成员注册性能测试")
+    parser.add_argument("--groups", type=int, default=20, help="群数量")
+    parser.add_argument("--members", type=int, default=2000, help="每个群的成员数")
+    parser.add_argument("--concurrency", type=int, default=8, help="同时注册的群数")
+    parser.add_argument("--skip-old", action="store_true", help="不测试逐个注册，数据量大时很慢")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+离线的jx3api模拟服务器，用于压力测试和性能测试，不消耗jx3api的额度。
+
+http接口返回`fixtures`下的同名数据（如`data/active/current`返回`data_active_current.json`），
+ws连接后会定时推送`fixtures/ws`下的消息。
+
+在项目根目录下运行：
+```
+python benchmark/stub_server.py --port 5700 --latency 100 --error-rate 0.05
+```
+然后在.env中设置：
+```
+jx3api_url = "http://127.0.0.1:5700"
+jx3api_ws_path = "ws://127.0.0.1:5700/ws"
+```
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from pathlib import Path
+
+import uvicorn
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def load_fixtures() -> tuple[dict[str, dict], list[dict]]:
+    """加载http和ws的数据"""
+    api_data = {
+        path.stem: json.loads(path.read_text(encoding="utf-8"))
+        for path in FIXTURES.glob("*.json")
+    }
+    ws_data = [
+        json.loads(path.read_text(encoding="utf-8"))
+        for path in (FIXTURES / "ws").glob("*.json")
+    ]
+    return api_data, ws_data
+
+
+def scale_payload(data, scale: int):
+    """放大返回数据，列表重复scale次"""
+    if scale <= 1:
+        return data
+    if isinstance(data, list):
+        return data * scale
+    if isinstance(data, dict):
+        return {key: scale_payload(value, scale) for key, value in data.items()}
+    return data
+
+
+def create_app(args: argparse.Namespace) -> FastAPI:
+    """创建模拟服务器"""
+    app = FastAPI()
+    api_data, ws_data = load_fixtures()
+    stats = {"requests": 0, "errors": 0}
+
+    async def delay():
+        latency = max(0.0, random.gauss(args.latency, args.jitter)) / 1000
+        await asyncio.sleep(latency)
+
+    @app.get("/stats")
+    async def _():
+        return stats
+
+    @app.websocket("/ws")
+    async def _(websocket: WebSocket):
+        await websocket.accept()
+        try:
+            while True:
+                await asyncio.sleep(args.ws_interval)
+                message = random.choice(ws_data)
+                await websocket.send_text(json.dumps(message, ensure_ascii=False))
+        except WebSocketDisconnect:
+            pass
+
+    @app.get("/{path:path}")
+    async def _(path: str, request: Request):
+        stats["requests"] += 1
+        await delay()
+        if random.random() < args.error_rate:
+            stats["errors"] += 1
+            return PlainTextResponse("502 Bad Gateway", status_code=502)
+
+        endpoint = path.strip("/").replace("/", "_")
+        fixture = api_data.get(endpoint)
+        if fixture is None:
+            content = {"code": 400, "msg": f"未知接口：{endpoint}", "data": {}}
+        else:
+            content = dict(fixture)
+            content["data"] = scale_payload(fixture["data"], args.payload_scale)
+        content["time"] = int(time.time())
+        return JSONResponse(content)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="jx3api模拟服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5700)
+    parser.add_argument("--latency", type=float, default=50, help="平均延迟，单位毫秒")
+    parser.add_argument("--jitter", type=float, default=10, help="延迟标准差，单位毫秒")
+    parser.add_argument("--error-rate", type=float, default=0, help="返回502的比例")
+    parser.add_argument("--payload-scale", type=int, default=1, help="列表数据放大倍数")
+    parser.add_argument("--ws-interval", type=float, default=5, help="ws推送间隔，单位秒")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 
 from nonebot import get_driver
 from pydantic import BaseModel, Extra, Field
@@ -17,6 +18,34 @@ class Jx3ApiConfig(BaseModel, extra=Extra.ignore):
     """主站的url"""
     api_token: str = Field("", alias="jx3api_token")
     """主站的token"""
+    fast_decode: bool = Field(True, alias="jx3api_fast_decode")
+    """是否使用快速解析，不校验返回的data"""
+    cache: bool = Field(True, alias="jx3api_cache")
+    """是否开启接口缓存"""
+    cache_persist: bool = Field(False, alias="jx3api_cache_persist")
+    """是否将排行、物价等缓存保存到本地"""
+    cache_persist_size: int = Field(5000, alias="jx3api_cache_persist_size")
+    """本地缓存最多条数"""
+    retry: int = Field(2, alias="jx3api_retry")
+    """连接失败或服务器5xx错误时的重试次数"""
+    deadline: float = Field(15, alias="jx3api_deadline")
+    """一次请求（含重试）最多等待时间，单位秒"""
+    breaker_threshold: int = Field(5, alias="jx3api_breaker_threshold")
+    """接口连续失败多少次后熔断"""
+    breaker_recovery: int = Field(30, alias="jx3api_breaker_recovery")
+    """熔断后多少秒重新尝试"""
+    rate_data: float = Field(0, alias="jx3api_rate_data")
+    """data接口每秒请求数，0为不限流"""
+    rate_data_burst: int = Field(10, alias="jx3api_rate_data_burst")
+    """data接口允许的突发请求数"""
+    rate_view: float = Field(0, alias="jx3api_rate_view")
+    """view接口每秒请求数，0为不限流"""
+    rate_view_burst: int = Field(3, alias="jx3api_rate_view_burst")
+    """view接口允许的突发请求数"""
+    rate_mode: Literal["queue", "reject"] = Field("queue", alias="jx3api_rate_mode")
+    """限流模式，queue：排队等待，reject：直接拒绝"""
+    rate_timeout: float = Field(10, alias="jx3api_rate_timeout")
+    """排队最多等待时间，单位秒，超出则拒绝"""
 
 
 class Jx3ApiV2Config(BaseModel, extra=Extra.ignore):
@@ -100,6 +129,97 @@ class DefaultConfig(BaseModel, extra=Extra.ignore):
     """晚安通知内容"""
 
 
+class HttpConfig(BaseModel, extra=Extra.ignore):
+    """
+    http客户端设置
+    """
+
+    max_connections: int = Field(100, alias="http_max_connections")
+    """连接池最大连接数"""
+    max_keepalive: int = Field(20, alias="http_max_keepalive")
+    """最大保持连接数"""
+    keepalive_expiry: float = Field(30.0, alias="http_keepalive_expiry")
+    """空闲连接保持时间，单位秒"""
+    per_host: int = Field(0, alias="http_per_host")
+    """单个域名最大并发请求数，0为不限制"""
+    http2: bool = Field(False, alias="http_http2")
+    """是否开启HTTP/2，需要安装h2"""
+    connect_timeout: float = Field(5.0, alias="http_connect_timeout")
+    """连接超时，单位秒"""
+    read_timeout: float = Field(10.0, alias="http_read_timeout")
+    """读取超时，单位秒"""
+
+
+class BrowserConfig(BaseModel, extra=Extra.ignore):
+    """
+    浏览器设置
+    """
+
+    workers: int = Field(1, alias="browser_workers")
+    """渲染进程数，每个进程启动一个浏览器"""
+    pool_size: int = Field(4, alias="browser_pool_size")
+    """每个渲染进程的页面池大小"""
+    page_max_uses: int = Field(100, alias="browser_page_max_uses")
+    """单个页面使用多少次后重新创建"""
+    pool_timeout: float = Field(30.0, alias="browser_pool_timeout")
+    """等待空闲页面的超时时间，单位秒"""
+    ready_timeout: int = Field(5000, alias="browser_ready_timeout")
+    """等待模板渲染完成信号的超时时间，单位毫秒"""
+    image_timeout: int = Field(2000, alias="browser_image_timeout")
+    """单张图片的加载时间，超时后不再等待，单位毫秒"""
+    render_cache: bool = Field(True, alias="browser_render_cache")
+    """是否缓存渲染结果，相同模板和数据直接返回图片"""
+    render_cache_size: int = Field(64, alias="browser_render_cache_size")
+    """内存缓存大小，单位MB"""
+    render_cache_persist: bool = Field(False, alias="browser_render_cache_persist")
+    """是否将渲染结果缓存到data目录下"""
+    render_cache_persist_size: int = Field(
+        512, alias="browser_render_cache_persist_size"
+    )
+    """磁盘缓存大小，单位MB"""
+    template_auto_reload: bool = Field(False, alias="browser_template_auto_reload")
+    """模板修改后是否自动重新加载，开发时可以打开"""
+    template_bytecode_cache: bool = Field(
+        True, alias="browser_template_bytecode_cache"
+    )
+    """是否将编译后的模板缓存到data目录下，加快启动"""
+    image_quality: int = Field(90, alias="browser_image_quality")
+    """jpeg和webp图片的默认质量"""
+    device_scale_factor: float = Field(1.0, alias="browser_device_scale_factor")
+    """页面的缩放比例，越大图片越清晰，体积也越大"""
+    icon_cache: bool = Field(True, alias="browser_icon_cache")
+    """是否将模板中的远程图片缓存到data目录下"""
+    icon_cache_size: int = Field(256, alias="browser_icon_cache_size")
+    """远程图片缓存大小，单位MB"""
+    render_concurrency: int = Field(4, alias="browser_render_concurrency")
+    """最多同时渲染的图片数，超出的排队"""
+    render_max_queue: int = Field(50, alias="browser_render_max_queue")
+    """排队的最大数量，超出后回复繁忙"""
+    render_max_group_queue: int = Field(5, alias="browser_render_max_group_queue")
+    """单个群排队的最大数量，超出后回复繁忙"""
+
+
+class DatabaseConfig(BaseModel, extra=Extra.ignore):
+    """
+    数据库设置
+    """
+
+    tuned: bool = Field(True, alias="database_tuned")
+    """是否使用下面的sqlite参数，关闭时使用tortoise默认参数"""
+    journal_mode: str = Field("WAL", alias="database_journal_mode")
+    """日志模式，WAL模式下读写互不阻塞"""
+    synchronous: str = Field("NORMAL", alias="database_synchronous")
+    """同步模式，WAL模式下NORMAL已足够安全"""
+    mmap_size: int = Field(268435456, alias="database_mmap_size")
+    """内存映射大小，单位字节"""
+    cache_size: int = Field(-65536, alias="database_cache_size")
+    """页缓存大小，负数时单位为KB"""
+    busy_timeout: int = Field(5000, alias="database_busy_timeout")
+    """数据库被锁时的等待时间，单位毫秒"""
+    temp_store: str = Field("MEMORY", alias="database_temp_store")
+    """临时表存放位置"""
+
+
 class PathConfig(BaseModel, extra=Extra.ignore):
     """
     路径设置
@@ -144,6 +264,12 @@ weather_config = WeatherConfig.parse_obj(config)
 """天气插件配置"""
 default_config = DefaultConfig.parse_obj(config)
 """默认设置"""
+http_config = HttpConfig.parse_obj(config)
+"""http客户端设置"""
+browser_config = BrowserConfig.parse_obj(config)
+"""浏览器设置"""
+database_config = DatabaseConfig.parse_obj(config)
+"""数据库设置"""
 path_config = PathConfig.parse_obj(config)
 """路径设置"""
 logs_config = LogsConfig.parse_obj(config)
@@ -4,6 +4,97 @@
 
 from nonebot.log import logger
 from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+
+DATABASE_PRAGMAS = (
+    "journal_mode",
+    "synchronous",
+    "mmap_size",
+    "cache_size",
+    "busy_timeout",
+    "temp_store",
+)
+"""启动时报告的sqlite参数"""
+
+
+def get_credentials(database_path: str) -> dict:
+    """
+    说明:
+        获取sqlite连接参数，除file_path外的参数会在连接时以PRAGMA执行
+    """
+    # 在nonebot初始化后才能读取配置
+    from src.config import database_config
+
+    credentials = {"file_path": database_path}
+    if database_config.tuned:
+        credentials |= {
+            "journal_mode": database_config.journal_mode,
+            "synchronous": database_config.synchronous,
+            "mmap_size": database_config.mmap_size,
+            "cache_size": database_config.cache_size,
+            "busy_timeout": database_config.busy_timeout,
+            "temp_store": database_config.temp_store,
+        }
+    return credentials
+
+
+async def report_pragmas():
+    """
+    报告数据库实际生效的参数
+    """
+    connection = Tortoise.get_connection("default")
+    values = []
+    for pragma in DATABASE_PRAGMAS:
+        _, rows = await connection.execute_query(f"PRAGMA {pragma}")
+        values.append(f"{pragma}={rows[0][0] if rows else None}")
+    logger.opt(colors=True).info(f"<g>数据库参数</g>：{'，'.join(values)}")
+
+
+async def _has_unique_index(connection, table: str, columns: tuple[str, ...]) -> bool:
+    """
+    检查表是否已有这些列的唯一索引
+    """
+    _, indexes = await connection.execute_query(f'PRAGMA index_list("{table}")')
+    for index in indexes:
+        if not index["unique"]:
+            continue
+        _, info = await connection.execute_query(
+            f'PRAGMA index_info("{index["name"]}")'
+        )
+        if tuple(one["name"] for one in info) == columns:
+            return True
+    return False
+
+
+async def upgrade_unique_index():
+    """
+    给旧数据库补上模型声明的唯一索引，generate_schemas不会修改已存在的表。
+    建索引前先删除重复的记录，保留id最小的一条
+    """
+    connection = Tortoise.get_connection("default")
+    for model in Tortoise.apps["models"].values():
+        meta = model._meta
+        for fields in meta.unique_together:
+            table = meta.db_table
+            columns = tuple(
+                meta.fields_map[field].source_field or field for field in fields
+            )
+            if await _has_unique_index(connection, table, columns):
+                continue
+            column_sql = ", ".join(f'"{column}"' for column in columns)
+            index_name = f"uid_{table}_{'_'.join(columns)}"
+            async with in_transaction("default") as transaction:
+                deleted, _ = await transaction.execute_query(
+                    f'DELETE FROM "{table}" WHERE "id" NOT IN '
+                    f'(SELECT MIN("id") FROM "{table}" GROUP BY {column_sql})'
+                )
+                await transaction.execute_query(
+                    f'CREATE UNIQUE INDEX "{index_name}" ON "{table}" ({column_sql})'
+                )
+            logger.opt(colors=True).info(
+                f"<g>已添加唯一索引</g>：{table}({', '.join(columns)})，"
+                f"删除重复记录 {deleted} 条"
+            )
 
 
 async def database_init():
@@ -12,7 +103,6 @@ async def database_init():
     """
     logger.debug("正在注册数据库")
     database_path = "./data/data.db"
-    db_url = f"sqlite://{database_path}"
     # 这里填要加载的表
     models = [
         "src.modules.group_info",
@@ -22,7 +112,17 @@ async def database_init():
         "src.modules.search_record",
         "src.modules.baizhanyiwenlu_info",
     ]
-    modules = {"models": models}
-    await Tortoise.init(db_url=db_url, modules=modules)
+    config = {
+        "connections": {
+            "default": {
+                "engine": "tortoise.backends.sqlite",
+                "credentials": get_credentials(database_path),
+            }
+        },
+        "apps": {"models": {"models": models, "default_connection": "default"}},
+    }
+    await Tortoise.init(config=config)
     await Tortoise.generate_schemas()
+    await upgrade_unique_index()
     logger.opt(colors=True).info("<g>数据库初始化成功。</g>")
+    await report_pragmas()
@@ -2,16 +2,32 @@
 jx3api接口的实现，用于连接api网站的数据处理
 """
 
+import asyncio
+import json
+import random
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
 from functools import partial
-from typing import Any, Optional
+from pathlib import Path
+from typing import Any, Literal, NamedTuple, Optional
 
-from httpx import AsyncClient
+from httpx import AsyncClient, ConnectError, ConnectTimeout
+from nonebot.utils import run_sync
 from pydantic import BaseModel
 from typing_extensions import Protocol
 
-from src.config import Jx3ApiConfig, jx3api_config
+from src.config import Jx3ApiConfig, jx3api_config, path_config
+from src.utils.client import create_client
 from src.utils.log import logger
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
 SERVER_DICT = {
     "长安城": ["长安城", "长安"],
     "龙争虎斗": ["龙争虎斗", "龙虎"],
@@ -31,6 +47,130 @@ SERVER_DICT = {
 }
 """区服列表"""
 
+_TRADITIONAL_TABLE = str.maketrans(
+    "長龍爭鬥鬭戀劍劒膽輪擲華轉媽風萬獨滿俠鵝夢雙鎮絕驕電縱隻陣飛橫斷",
+    "长龙争斗斗恋剑剑胆轮掷华转妈风万独满侠鹅梦双镇绝骄电纵只阵飞横断",
+)
+"""区服名繁体字转简体，覆盖`SERVER_DICT`中所有简繁不同的字，增加别名时需要同步补充"""
+
+
+def normalize_server_name(name: str) -> str:
+    """
+    说明:
+        规范化区服名：全角转半角，去掉空白，繁体转简体，英文转小写
+    """
+    name = unicodedata.normalize("NFKC", name)
+    name = "".join(name.split())
+    return name.translate(_TRADITIONAL_TABLE).lower()
+
+
+SERVER_ALIAS: dict[str, str] = {}
+"""区服别名索引，规范化后的别名 -> 主区名称"""
+
+
+def add_server_alias(server_dict: dict[str, list[str]]):
+    """
+    说明:
+        将区服别名加入索引，主区名称本身也会作为别名
+
+    参数:
+        * `server_dict`：主区名称 -> 别名列表
+    """
+    for server, aliases in server_dict.items():
+        for alias in [server, *aliases]:
+            SERVER_ALIAS[normalize_server_name(alias)] = server
+
+
+def load_server_alias(path: Path) -> int:
+    """
+    说明:
+        从json文件加载区服别名，格式同`SERVER_DICT`，合服后不需要改代码
+
+    参数:
+        * `path`：json文件路径
+
+    返回:
+        * `int`：加载的主区数量
+    """
+    with open(path, encoding="utf-8") as f:
+        server_dict: dict[str, list[str]] = json.load(f)
+    add_server_alias(server_dict)
+    return len(server_dict)
+
+
+SERVER_ALIAS_FILE = Path(path_config.data) / "server_alias.json"
+"""区服别名文件，存在时在启动时加载"""
+
+add_server_alias(SERVER_DICT)
+if SERVER_ALIAS_FILE.exists():
+    try:
+        load_server_alias(SERVER_ALIAS_FILE)
+    except Exception as e:
+        logger.error(f"<r>加载区服别名文件出错：</r> | {str(e)}")
+
+
+class CachePolicy(NamedTuple):
+    """接口缓存策略"""
+
+    ttl: int
+    """有效时间，单位秒"""
+    max_size: int
+    """最多缓存条数，超出后淘汰最久未使用的"""
+    stale: int = 0
+    """过期后仍可返回旧数据的时间，单位秒，期间会在后台刷新"""
+    persist: bool = False
+    """是否同时保存到本地，重启后仍可使用"""
+
+
+CACHE_POLICY: dict[str, CachePolicy] = {
+    "data_active_current": CachePolicy(ttl=600, max_size=64, stale=1800),
+    "data_active_calculate": CachePolicy(ttl=600, max_size=16),
+    "data_trade_demon": CachePolicy(ttl=300, max_size=32, stale=600),
+    "data_server_check": CachePolicy(ttl=30, max_size=32),
+    "data_server_status": CachePolicy(ttl=30, max_size=32),
+    "data_trade_record": CachePolicy(ttl=600, max_size=256, persist=True),
+    "data_trade_xiaohei": CachePolicy(ttl=600, max_size=256, persist=True),
+    "data_school_snacks": CachePolicy(ttl=3600, max_size=64),
+    "data_school_equip": CachePolicy(ttl=3600, max_size=64),
+    "data_school_matrix": CachePolicy(ttl=3600, max_size=64),
+    "data_school_macro": CachePolicy(ttl=3600, max_size=64),
+    "data_luck_require": CachePolicy(ttl=3600, max_size=128),
+    "data_luck_strategy": CachePolicy(ttl=3600, max_size=128),
+    "data_luck_sub_require": CachePolicy(ttl=3600, max_size=128),
+    "data_luck_sub_strategy": CachePolicy(ttl=3600, max_size=128),
+    "data_luck_collect": CachePolicy(ttl=300, max_size=32),
+    "data_rank_various": CachePolicy(
+        ttl=1800, max_size=256, stale=3600, persist=True
+    ),
+    "data_rank_tribe": CachePolicy(
+        ttl=1800, max_size=128, stale=3600, persist=True
+    ),
+    "data_rank_trials": CachePolicy(
+        ttl=1800, max_size=256, stale=3600, persist=True
+    ),
+    "view_server_sand": CachePolicy(ttl=300, max_size=32),
+}
+"""
+接口缓存策略，只有在这里登记的接口才会缓存。
+
+带推栏ticket查询个人数据的接口（如`data_luck_serendipity`、`data_role_attribute`）
+不要登记在这里。
+"""
+
+RANK_VARIOUS_TYPES = (
+    "名士五十强",
+    "老江湖五十强",
+    "兵甲藏家五十强",
+    "名师五十强",
+    "阵营英雄五十强",
+    "薪火相传五十强",
+    "庐园广记一百强",
+)
+"""个人排行榜类型"""
+
+_CREDENTIAL_PARAMS = {"token", "ticket", "secretId", "secretKey"}
+"""凭证类参数，不影响返回内容，不参与缓存键"""
+
 
 class _ApiCall(Protocol):
     async def __call__(self, **kwargs: Any) -> Any:
@@ -50,6 +190,353 @@ class Response(BaseModel):
     """时间戳"""
 
 
+def decode_response(content: bytes | str, fast: bool = True) -> Response:
+    """
+    说明:
+        解析api返回内容，fast模式只检查外层code/msg/time，data不做校验直接使用
+
+    参数:
+        * `content`：返回的json内容
+        * `fast`：是否使用快速解析，安装了orjson时会使用orjson
+
+    返回:
+        * `Response`：返回数据
+    """
+    if not fast:
+        return Response.parse_raw(content)
+    obj = json_loads(content)
+    data = obj.get("data")
+    if not isinstance(data, (dict, list)):
+        data = {}
+    return Response.construct(
+        code=int(obj["code"]),
+        msg=str(obj.get("msg", "")),
+        data=data,
+        time=int(obj.get("time") or 0),
+    )
+
+
+class ApiCache:
+    """
+    jx3api的内存缓存，按接口分别做有效期和LRU淘汰
+    """
+
+    _store: dict[str, OrderedDict[tuple, tuple[float, Response]]]
+    """缓存数据，接口名 -> (缓存键 -> (过期时间, 返回数据))"""
+    hits: int
+    """命中次数"""
+    misses: int
+    """未命中次数"""
+    stale_hits: int
+    """返回过期数据的次数"""
+
+    def __init__(self):
+        self._store = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    @staticmethod
+    def make_key(params: dict[str, Any]) -> tuple:
+        """
+        说明:
+            将请求参数规范化为缓存键，忽略凭证参数和空值
+        """
+        return tuple(
+            sorted(
+                (key, str(value))
+                for key, value in params.items()
+                if value is not None and key not in _CREDENTIAL_PARAMS
+            )
+        )
+
+    def get(
+        self, endpoint: str, key: tuple, ignore_expire: bool = False
+    ) -> Optional[tuple[Response, bool]]:
+        """
+        说明:
+            获取缓存，超出旧数据期限或不存在时返回None
+
+        参数:
+            * `endpoint`：接口名
+            * `key`：缓存键
+            * `ignore_expire`：是否忽略期限，接口熔断时使用
+
+        返回:
+            * `Optional[tuple[Response, bool]]`：缓存数据的副本，是否为过期数据
+        """
+        bucket = self._store.get(endpoint)
+        item = bucket.get(key) if bucket is not None else None
+        time_now = time.monotonic()
+        if item is None or (
+            not ignore_expire and item[0] + CACHE_POLICY[endpoint].stale < time_now
+        ):
+            # 过期数据留到LRU淘汰，熔断时还可以使用
+            self.misses += 1
+            return None
+        bucket.move_to_end(key)
+        stale = item[0] < time_now
+        if stale:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        # 处理函数会原地修改data，这里返回副本
+        return item[1].copy(deep=True), stale
+
+    def set(
+        self, endpoint: str, key: tuple, response: Response, ttl: Optional[float] = None
+    ):
+        """
+        说明:
+            写入缓存，超出容量时淘汰最久未使用的数据
+
+        参数:
+            * `endpoint`：接口名
+            * `key`：缓存键
+            * `response`：返回数据
+            * `ttl`：剩余有效时间，默认使用接口策略
+        """
+        policy = CACHE_POLICY[endpoint]
+        if ttl is None:
+            ttl = policy.ttl
+        bucket = self._store.setdefault(endpoint, OrderedDict())
+        bucket[key] = (time.monotonic() + ttl, response.copy(deep=True))
+        bucket.move_to_end(key)
+        while len(bucket) > policy.max_size:
+            bucket.popitem(last=False)
+
+    def clear(self):
+        """清空缓存"""
+        self._store.clear()
+
+
+class CircuitBreaker:
+    """
+    接口熔断器，连续失败后暂停请求，一段时间后放行一个请求试探
+    """
+
+    state: Literal["closed", "open", "half_open"]
+    """状态：正常，熔断，试探"""
+    failures: int
+    """连续失败次数"""
+    opened_at: float
+    """熔断开始时间"""
+    threshold: int
+    """熔断需要的连续失败次数"""
+    recovery: float
+    """熔断后多久开始试探，单位秒"""
+    _probing: bool
+    """是否已有试探请求"""
+
+    def __init__(self, threshold: int, recovery: float):
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.threshold = threshold
+        self.recovery = recovery
+        self._probing = False
+
+    def allow(self) -> bool:
+        """
+        说明:
+            是否允许发起请求
+        """
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.recovery:
+                return False
+            self.state = "half_open"
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self):
+        """记录一次成功请求"""
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def release(self):
+        """请求没有发出（如被限流），放弃本次试探，不影响熔断状态"""
+        self._probing = False
+
+    def record_failure(self):
+        """记录一次失败请求"""
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+class TokenBucket:
+    """
+    令牌桶限流器，令牌不足时排队等待或直接拒绝
+    """
+
+    rate: float
+    """每秒生成令牌数，为0时不限流"""
+    capacity: float
+    """桶容量，即允许的突发请求数"""
+    tokens: float
+    """当前令牌数，排队时为负数"""
+    updated: float
+    """上次更新令牌的时间"""
+    queued: int
+    """排队的请求数"""
+    rejected: int
+    """被拒绝的请求数"""
+    waited: float
+    """累计排队时间，单位秒"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.queued = 0
+        self.rejected = 0
+        self.waited = 0.0
+
+    async def acquire(self, block: bool, timeout: float) -> bool:
+        """
+        说明:
+            获取一个令牌
+
+        参数:
+            * `block`：令牌不足时是否排队等待
+            * `timeout`：最多等待时间，单位秒
+
+        返回:
+            * `bool`：是否获取成功
+        """
+        if self.rate <= 0:
+            return True
+        time_now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (time_now - self.updated) * self.rate
+        )
+        self.updated = time_now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+
+        wait = (1 - self.tokens) / self.rate
+        if not block or wait > timeout:
+            self.rejected += 1
+            return False
+        # 先预留令牌，后来的请求会排在后面
+        self.tokens -= 1
+        self.queued += 1
+        self.waited += wait
+        await asyncio.sleep(wait)
+        return True
+
+
+class DiskCache:
+    """
+    jx3api的本地缓存，使用sqlite保存在data文件夹下，第一次使用时才打开
+    """
+
+    path: Path
+    """数据库文件路径"""
+    max_size: int
+    """最多保存条数"""
+    _conn: Optional[sqlite3.Connection] = None
+    """数据库连接"""
+    _lock: threading.Lock
+    """线程锁，sqlite操作在线程池中执行"""
+
+    def __init__(self, path: Path, max_size: int):
+        self.path = path
+        self.max_size = max_size
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """打开数据库，并清理超出旧数据可用时间的数据"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS api_cache ("
+                "key TEXT PRIMARY KEY, expire REAL NOT NULL, data TEXT NOT NULL)"
+            )
+            # 过期但仍在stale时间内的数据重启后还能使用，超出最长stale时间的才删除
+            stale = max(
+                (policy.stale for policy in CACHE_POLICY.values() if policy.persist),
+                default=0,
+            )
+            self._conn.execute(
+                "DELETE FROM api_cache WHERE expire < ?", (time.time() - stale,)
+            )
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def _make_key(endpoint: str, key: tuple) -> str:
+        return json.dumps([endpoint, key], ensure_ascii=False)
+
+    @run_sync
+    def get(self, endpoint: str, key: tuple) -> Optional[tuple[float, Response]]:
+        """
+        说明:
+            读取本地缓存
+
+        参数:
+            * `endpoint`：接口名
+            * `key`：缓存键
+
+        返回:
+            * `Optional[tuple[float, Response]]`：剩余有效时间（可能为负，表示已过期），返回数据
+        """
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT expire, data FROM api_cache WHERE key = ?",
+                    (self._make_key(endpoint, key),),
+                )
+                .fetchone()
+            )
+        if row is None:
+            return None
+        expire, data = row
+        return expire - time.time(), decode_response(data)
+
+    @run_sync
+    def set(self, endpoint: str, key: tuple, response: Response):
+        """
+        说明:
+            写入本地缓存，超出条数时删除最早过期的数据
+
+        参数:
+            * `endpoint`：接口名
+            * `key`：缓存键
+            * `response`：返回数据
+        """
+        expire = time.time() + CACHE_POLICY[endpoint].ttl
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO api_cache (key, expire, data) VALUES (?, ?, ?)",
+                (self._make_key(endpoint, key), expire, response.json()),
+            )
+            conn.execute(
+                "DELETE FROM api_cache WHERE key IN (SELECT key FROM api_cache "
+                "ORDER BY expire DESC LIMIT -1 OFFSET ?)",
+                (self.max_size,),
+            )
+            conn.commit()
+
+    def close(self):
+        """关闭数据库"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
 class JX3API:
     """
     jx3api接口类，负责访问网站接口，获取数据。
@@ -59,6 +546,20 @@ class JX3API:
     """浏览器客户端"""
     config: Jx3ApiConfig
     """api设置"""
+    cache: ApiCache
+    """接口缓存"""
+    disk_cache: Optional[DiskCache]
+    """本地缓存，未开启时为None"""
+    _inflight: dict[tuple, asyncio.Task]
+    """正在进行中的请求，相同url和参数的并发请求共用一个"""
+    requested: int
+    """实际发往api网站的请求次数"""
+    coalesced: int
+    """被合并的并发请求次数"""
+    breakers: dict[str, CircuitBreaker]
+    """各接口的熔断器"""
+    limiters: dict[str, TokenBucket]
+    """限流器，按接口类型（data，view）区分"""
 
     def __new__(cls, *args, **kwargs):
         """单例"""
@@ -73,7 +574,20 @@ class JX3API:
             self.config.api_url += "/"
         token = self.config.api_token or ""
         headers = {"token": token, "User-Agent": "Nonebot2-jx3-bot"}
-        self.client = AsyncClient(headers=headers)
+        self.client = create_client(headers=headers)
+        self.cache = ApiCache()
+        self.disk_cache = None
+        if self.config.cache_persist:
+            path = Path(path_config.data) / "jx3api_cache.db"
+            self.disk_cache = DiskCache(path, self.config.cache_persist_size)
+        self._inflight = {}
+        self.requested = 0
+        self.coalesced = 0
+        self.breakers = {}
+        self.limiters = {
+            "data": TokenBucket(self.config.rate_data, self.config.rate_data_burst),
+            "view": TokenBucket(self.config.rate_view, self.config.rate_view_burst),
+        }
 
     def app_server(self, *, name: str) -> Optional[str]:
         """
@@ -86,19 +600,236 @@ class JX3API:
         返回:
             * `str`：主区名称
         """
-        for key, value in SERVER_DICT.items():
-            if name in value:
-                return key
+        return SERVER_ALIAS.get(normalize_server_name(name))
+
+    def _get_endpoint(self, url: str) -> str:
+        """通过url获取接口名"""
+        return url.removeprefix(self.config.api_url).replace("/", "_")
+
+    def _get_breaker(self, endpoint: str) -> CircuitBreaker:
+        """获取接口的熔断器"""
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                self.config.breaker_threshold, self.config.breaker_recovery
+            )
+            self.breakers[endpoint] = breaker
+        return breaker
+
+    def _fallback(self, endpoint: str, cache_key: Optional[tuple]) -> Response:
+        """接口熔断时，返回已过期的缓存，没有缓存则返回失败"""
+        if cache_key is not None and (
+            cached := self.cache.get(endpoint, cache_key, ignore_expire=True)
+        ):
+            logger.debug(f"<y>jx3api接口熔断，返回旧缓存:</y> | {endpoint}")
+            return cached[0]
+        return Response(code=0, msg="jx3api接口暂时不可用，请稍后再试", data={}, time=0)
+
+    async def _request(
+        self, url: str, data: dict[str, Any], endpoint: str, cache_key: Optional[tuple]
+    ) -> Response:
+        """
+        说明:
+            实际请求api网站，成功后写入缓存
+
+        参数:
+            * `url`：请求地址
+            * `data`：请求参数
+            * `endpoint`：接口名
+            * `cache_key`：缓存键，为None时不缓存
+        """
+        breaker = self._get_breaker(endpoint)
+        limiter = self.limiters.get(endpoint.split("_")[0])
+        try:
+            allowed = limiter is None or await limiter.acquire(
+                block=self.config.rate_mode == "queue", timeout=self.config.rate_timeout
+            )
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        if not allowed:
+            # 请求没有发出，试探的机会留给下一个请求
+            breaker.release()
+            logger.debug(f"<y>jx3api请求被限流:</y> | {endpoint}")
+            return Response(code=0, msg="查询的人太多啦，请稍后再试", data={}, time=0)
+
+        response = await self._send(url, data, endpoint)
+        if response is None:
+            breaker.record_failure()
+            return Response(code=0, msg="请求jx3api失败，请稍后再试", data={}, time=0)
+
+        breaker.record_success()
+
+        if cache_key is not None and response.code == 200:
+            self.cache.set(endpoint, cache_key, response)
+            if self.disk_cache and CACHE_POLICY[endpoint].persist:
+                try:
+                    await self.disk_cache.set(endpoint, cache_key, response)
+                except Exception as e:
+                    logger.error(f"<y>jx3api本地缓存写入出错：</y> | {str(e)}")
+        return response
+
+    async def _send(
+        self, url: str, data: dict[str, Any], endpoint: str
+    ) -> Optional[Response]:
+        """
+        说明:
+            发出请求并解析，只重试连接失败和服务器5xx错误，所有尝试共用一个截止时间
+
+        参数:
+            * `url`：请求地址
+            * `data`：请求参数
+            * `endpoint`：接口名
+
+        返回:
+            * `Optional[Response]`：解析后的返回，失败时为None
+        """
+        deadline = time.monotonic() + self.config.deadline
+        for attempt in range(self.config.retry + 1):
+            if attempt:
+                # 指数退避，加随机抖动避免同时重试
+                delay = random.uniform(0, 0.5 * 2**attempt)
+                if time.monotonic() + delay >= deadline:
+                    break
+                await asyncio.sleep(delay)
+            self.requested += 1
+            try:
+                res = await asyncio.wait_for(
+                    self.client.get(url=url, params=data), deadline - time.monotonic()
+                )
+            except (ConnectError, ConnectTimeout) as e:
+                logger.error(
+                    f"<y>jx3api连接出错：</y> | {endpoint} | 第{attempt + 1}次 | {str(e)}"
+                )
+                continue
+            except asyncio.TimeoutError:
+                logger.error(f"<y>jx3api请求超时：</y> | {endpoint} | 第{attempt + 1}次")
+                return None
+            except Exception as e:
+                # 读取超时等错误说明请求已到达上游，重试只会再等一遍
+                logger.error(
+                    f"<y>jx3api请求出错：</y> | {endpoint} | 第{attempt + 1}次 | {str(e)}"
+                )
+                return None
+            if res.status_code >= 500:
+                logger.error(
+                    f"<y>jx3api服务器错误：</y> | {endpoint} | 第{attempt + 1}次 | {res.status_code}"
+                )
+                continue
+            try:
+                return decode_response(res.content, self.config.fast_decode)
+            except Exception as e:
+                logger.error(f"<y>jx3api返回解析出错：</y> | {endpoint} | {str(e)}")
+                return None
         return None
 
-    async def call_api(self, url: str, **data: Any) -> Response:
-        """请求api网站数据"""
+    async def _load_disk_cache(self, endpoint: str, cache_key: tuple) -> bool:
+        """
+        说明:
+            从本地缓存加载到内存缓存
+
+        返回:
+            * `bool`：是否加载成功
+        """
+        if not self.disk_cache or not CACHE_POLICY[endpoint].persist:
+            return False
         try:
-            res = await self.client.get(url=url, params=data)
-            return Response.parse_obj(res.json())
+            item = await self.disk_cache.get(endpoint, cache_key)
         except Exception as e:
-            logger.error(f"<y>jx3api请求出错：</y> | {str(e)}")
-            return Response(code=0, msg=f"{str(e)}", data={}, time=0)
+            logger.error(f"<y>jx3api本地缓存读取出错：</y> | {str(e)}")
+            return False
+        if item is None:
+            return False
+        ttl, response = item
+        if ttl + CACHE_POLICY[endpoint].stale < 0:
+            return False
+        self.cache.set(endpoint, cache_key, response, ttl=ttl)
+        return True
+
+    def _get_flight(
+        self, url: str, data: dict[str, Any], endpoint: str, cache_key: Optional[tuple]
+    ) -> asyncio.Task:
+        """
+        说明:
+            获取请求task，相同url和参数的并发请求共用一个task，
+            单个调用被取消时不影响其他等待者
+        """
+        flight_key = (url, tuple(sorted((k, str(v)) for k, v in data.items())))
+        task = self._inflight.get(flight_key)
+        if task is None:
+            task = asyncio.create_task(
+                self._request(url, data, endpoint, cache_key)
+            )
+            self._inflight[flight_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(flight_key, None))
+        else:
+            self.coalesced += 1
+            logger.debug(f"<y>jx3api合并请求:</y> | {endpoint}")
+        return task
+
+    def _get_cache_key(self, endpoint: str, data: dict[str, Any]) -> Optional[tuple]:
+        """获取缓存键，不缓存的接口返回None"""
+        if self.config.cache and endpoint in CACHE_POLICY:
+            return self.cache.make_key(data)
+        return None
+
+    async def call_api(self, url: str, **data: Any) -> Response:
+        """请求api网站数据"""
+        endpoint = self._get_endpoint(url)
+        cache_key = self._get_cache_key(endpoint, data)
+        cached = None
+        if cache_key is not None:
+            cached = self.cache.get(endpoint, cache_key)
+            if cached is None and await self._load_disk_cache(endpoint, cache_key):
+                cached = self.cache.get(endpoint, cache_key)
+        breaker = self._get_breaker(endpoint)
+        if cached:
+            response, stale = cached
+            if stale and breaker.allow():
+                # 先返回旧数据，后台刷新
+                logger.debug(f"<y>jx3api缓存过期，后台刷新:</y> | {endpoint}")
+                self._get_flight(url, data, endpoint, cache_key)
+            else:
+                logger.debug(f"<y>jx3api缓存命中:</y> | {endpoint}")
+            return response
+
+        if not breaker.allow():
+            return self._fallback(endpoint, cache_key)
+        task = self._get_flight(url, data, endpoint, cache_key)
+        response = await asyncio.shield(task)
+        # 处理函数会原地修改data，每个调用者拿到各自的副本
+        return response.copy(deep=True)
+
+    async def refresh(self, name: str, **data: Any) -> Response:
+        """
+        说明:
+            跳过缓存直接请求接口，并刷新缓存
+
+        参数:
+            * `name`：接口名，如`data_active_current`
+            * `**data`：请求参数
+        """
+        url = self.config.api_url + name.replace("_", "/")
+        cache_key = self._get_cache_key(name, data)
+        if not self._get_breaker(name).allow():
+            return self._fallback(name, cache_key)
+        task = self._get_flight(url, data, name, cache_key)
+        return await asyncio.shield(task)
+
+    async def warm_up(self, servers: list[str]):
+        """
+        说明:
+            预热常用接口的缓存，避免每天刷新或维护后第一次查询等待
+
+        参数:
+            * `servers`：需要预热的服务器列表
+        """
+        for server in servers:
+            await self.refresh("data_active_current", server=server)
+            await self.refresh("data_trade_demon", server=server)
+            for type_ in RANK_VARIOUS_TYPES:
+                await self.refresh("data_rank_various", server=server, type=type_)
+        logger.debug(f"<y>jx3api缓存预热完成:</y> | {servers}")
 
     def __getattr__(self, name: str) -> _ApiCall:
         # 拼接url
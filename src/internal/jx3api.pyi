@@ -1,10 +1,76 @@
-from typing import Optional
+from pathlib import Path
+from typing import Any, Callable, Literal, NamedTuple, Optional
 
 from httpx import AsyncClient
 from pydantic import BaseModel
 
 from src.config import Jx3ApiConfig
 
+SERVER_DICT: dict[str, list[str]]
+"""区服列表"""
+
+SERVER_ALIAS: dict[str, str]
+"""区服别名索引，规范化后的别名 -> 主区名称"""
+
+SERVER_ALIAS_FILE: Path
+"""区服别名文件，存在时在启动时加载"""
+
+json_loads: Callable[[bytes | str], Any]
+"""json解析，安装了orjson时使用orjson"""
+
+
+def normalize_server_name(name: str) -> str:
+    """
+    说明:
+        规范化区服名：全角转半角，去掉空白，繁体转简体，英文转小写
+    """
+    ...
+
+
+def add_server_alias(server_dict: dict[str, list[str]]):
+    """
+    说明:
+        将区服别名加入索引，主区名称本身也会作为别名
+
+    参数:
+        * `server_dict`：主区名称 -> 别名列表
+    """
+    ...
+
+
+def load_server_alias(path: Path) -> int:
+    """
+    说明:
+        从json文件加载区服别名，格式同`SERVER_DICT`，合服后不需要改代码
+
+    参数:
+        * `path`：json文件路径
+
+    返回:
+        * `int`：加载的主区数量
+    """
+    ...
+
+
+class CachePolicy(NamedTuple):
+    """接口缓存策略"""
+
+    ttl: int
+    """有效时间，单位秒"""
+    max_size: int
+    """最多缓存条数，超出后淘汰最久未使用的"""
+    stale: int = ...
+    """过期后仍可返回旧数据的时间，单位秒，期间会在后台刷新"""
+    persist: bool = ...
+    """是否同时保存到本地，重启后仍可使用"""
+
+
+CACHE_POLICY: dict[str, CachePolicy]
+"""接口缓存策略，只有在这里登记的接口才会缓存"""
+
+RANK_VARIOUS_TYPES: tuple[str, ...]
+"""个人排行榜类型"""
+
 
 class Response(BaseModel):
     """返回数据模型"""
@@ -19,6 +85,160 @@ class Response(BaseModel):
     """时间戳"""
 
 
+def decode_response(content: bytes | str, fast: bool = ...) -> Response:
+    """
+    说明:
+        解析api返回内容，fast模式只检查外层code/msg/time，data不做校验直接使用
+
+    参数:
+        * `content`：返回的json内容
+        * `fast`：是否使用快速解析，安装了orjson时会使用orjson
+
+    返回:
+        * `Response`：返回数据
+    """
+    ...
+
+
+class ApiCache:
+    """jx3api的内存缓存，按接口分别做有效期和LRU淘汰"""
+
+    hits: int
+    """命中次数"""
+    misses: int
+    """未命中次数"""
+    stale_hits: int
+    """返回过期数据的次数"""
+
+    @staticmethod
+    def make_key(params: dict[str, Any]) -> tuple:
+        """
+        说明:
+            将请求参数规范化为缓存键，忽略凭证参数和空值
+        """
+        ...
+
+    def get(
+        self, endpoint: str, key: tuple, ignore_expire: bool = ...
+    ) -> Optional[tuple[Response, bool]]:
+        """
+        说明:
+            获取缓存，超出旧数据期限或不存在时返回None
+
+        返回:
+            * `Optional[tuple[Response, bool]]`：缓存数据的副本，是否为过期数据
+        """
+        ...
+
+    def set(
+        self, endpoint: str, key: tuple, response: Response, ttl: Optional[float] = ...
+    ):
+        """
+        说明:
+            写入缓存，超出容量时淘汰最久未使用的数据
+        """
+        ...
+
+    def clear(self):
+        """清空缓存"""
+        ...
+
+
+class CircuitBreaker:
+    """接口熔断器，连续失败后暂停请求，一段时间后放行一个请求试探"""
+
+    state: Literal["closed", "open", "half_open"]
+    """状态：正常，熔断，试探"""
+    failures: int
+    """连续失败次数"""
+    opened_at: float
+    """熔断开始时间"""
+    threshold: int
+    """熔断需要的连续失败次数"""
+    recovery: float
+    """熔断后多久开始试探，单位秒"""
+
+    def __init__(self, threshold: int, recovery: float): ...
+
+    def allow(self) -> bool:
+        """是否允许发起请求"""
+        ...
+
+    def record_success(self):
+        """记录一次成功请求"""
+        ...
+
+    def release(self):
+        """请求没有发出（如被限流），放弃本次试探，不影响熔断状态"""
+        ...
+
+    def record_failure(self):
+        """记录一次失败请求"""
+        ...
+
+
+class TokenBucket:
+    """令牌桶限流器，令牌不足时排队等待或直接拒绝"""
+
+    rate: float
+    """每秒生成令牌数，为0时不限流"""
+    capacity: float
+    """桶容量，即允许的突发请求数"""
+    tokens: float
+    """当前令牌数，排队时为负数"""
+    queued: int
+    """排队的请求数"""
+    rejected: int
+    """被拒绝的请求数"""
+    waited: float
+    """累计排队时间，单位秒"""
+
+    def __init__(self, rate: float, capacity: float): ...
+
+    async def acquire(self, block: bool, timeout: float) -> bool:
+        """
+        说明:
+            获取一个令牌
+
+        参数:
+            * `block`：令牌不足时是否排队等待
+            * `timeout`：最多等待时间，单位秒
+
+        返回:
+            * `bool`：是否获取成功
+        """
+        ...
+
+
+class DiskCache:
+    """jx3api的本地缓存，使用sqlite保存在data文件夹下，第一次使用时才打开"""
+
+    path: Path
+    """数据库文件路径"""
+    max_size: int
+    """最多保存条数"""
+
+    def __init__(self, path: Path, max_size: int): ...
+
+    async def get(self, endpoint: str, key: tuple) -> Optional[tuple[float, Response]]:
+        """
+        说明:
+            读取本地缓存
+
+        返回:
+            * `Optional[tuple[float, Response]]`：剩余有效时间（可能为负，表示已过期），返回数据
+        """
+        ...
+
+    async def set(self, endpoint: str, key: tuple, response: Response):
+        """写入本地缓存，超出条数时删除最早过期的数据"""
+        ...
+
+    def close(self):
+        """关闭数据库"""
+        ...
+
+
 class JX3API:
     """jx3api接口类"""
 
@@ -26,6 +246,43 @@ class JX3API:
     """浏览器客户端"""
     config: Jx3ApiConfig
     """api设置"""
+    cache: ApiCache
+    """接口缓存"""
+    disk_cache: Optional[DiskCache]
+    """本地缓存，未开启时为None"""
+    requested: int
+    """实际发往api网站的请求次数"""
+    coalesced: int
+    """被合并的并发请求次数"""
+    breakers: dict[str, CircuitBreaker]
+    """各接口的熔断器"""
+    limiters: dict[str, TokenBucket]
+    """限流器，按接口类型（data，view）区分"""
+
+    async def call_api(self, url: str, **data: Any) -> Response:
+        """请求api网站数据"""
+        ...
+
+    async def refresh(self, name: str, **data: Any) -> Response:
+        """
+        说明:
+            跳过缓存直接请求接口，并刷新缓存
+
+        参数:
+            * `name`：接口名，如`data_active_current`
+            * `**data`：请求参数
+        """
+        ...
+
+    async def warm_up(self, servers: list[str]):
+        """
+        说明:
+            预热常用接口的缓存，避免每天刷新或维护后第一次查询等待
+
+        参数:
+            * `servers`：需要预热的服务器列表
+        """
+        ...
 
     # ------------------------------------------------------------
     #                      Free  API
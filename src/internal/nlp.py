@@ -7,6 +7,7 @@ from typing import Optional
 from httpx import AsyncClient
 
 from src.config import nlp_config, voice_config
+from src.utils.client import client
 from src.utils.log import logger
 
 from .jx3api import JX3API, Response
@@ -23,7 +24,7 @@ class NLP:
     """青云客接口地址"""
 
     def __init__(self):
-        self.client = AsyncClient()
+        self.client = client
         self.api = JX3API()
         self.nlp_config = nlp_config
         self.voice_config = voice_config
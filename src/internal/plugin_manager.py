@@ -2,6 +2,7 @@
 插件管理器模块，用来管理插件
 """
 
+import asyncio
 from typing import Optional
 
 from nonebot.plugin import Plugin, get_loaded_plugins
@@ -17,6 +18,16 @@ class PluginManager:
     """已管理插件映射集"""
     inited: bool = False
     """是否已初始化"""
+    _index: dict[str, int] = {}
+    """插件模块名：在plugins中的序号，用于状态位图"""
+    _registered: dict[int, int] = {}
+    """群号：已注册插件的位图"""
+    _enabled: dict[int, int] = {}
+    """群号：已开启插件的位图"""
+    _status_loaded: bool = False
+    """插件状态是否已从数据库加载"""
+    _status_lock: Optional[asyncio.Lock] = None
+    """避免同时加载插件状态"""
 
     def __new__(cls, *args, **kwargs):
         """单例"""
@@ -47,17 +58,49 @@ class PluginManager:
                 continue
 
             # 储存所有受管理插件
+            self._index[one_plugin.name] = len(self.plugins)
             self.plugins[one_plugin.name] = one_plugin
         self.inited = True
 
+    def _set_bit(self, group_id: int, module_name: str, status: bool):
+        """
+        说明:
+            更新状态位图中的插件状态
+        """
+        index = self._index.get(module_name)
+        if index is None:
+            return
+        bit = 1 << index
+        self._registered[group_id] = self._registered.get(group_id, 0) | bit
+        enabled = self._enabled.get(group_id, 0)
+        self._enabled[group_id] = enabled | bit if status else enabled & ~bit
+
+    async def _load_status(self):
+        """
+        说明:
+            一次查询加载所有群的插件状态到位图
+        """
+        if self._status_loaded:
+            return
+        if self._status_lock is None:
+            self._status_lock = asyncio.Lock()
+        async with self._status_lock:
+            if self._status_loaded:
+                return
+            self.init()
+            records = await PluginInfo.get_all_status()
+            for group_id, module_name, status in records:
+                self._set_bit(group_id, module_name, status)
+            self._status_loaded = True
+
     async def load_plugins(self, group_id: int):
         """
         给某个群加载默认插件
         """
-        self.init()
+        await self._load_status()
+        registered = self._registered.get(group_id, 0)
         for module_name, plugin in self.plugins.items():
-            flag = await PluginInfo.check_inited(group_id, module_name)
-            if flag:
+            if registered & (1 << self._index[module_name]):
                 continue
             metadata = plugin.metadata
             config: PluginConfig = metadata.config
@@ -66,6 +109,61 @@ class PluginManager:
                 module_name=module_name,
                 status=config.default_status,
             )
+            self._set_bit(group_id, module_name, config.default_status)
+
+    async def get_plugin_status(self, group_id: int, module_name: str) -> Optional[bool]:
+        """
+        说明:
+            获取一个插件开关状态，从内存位图读取，不查询数据库
+
+        参数:
+            * `group_id`：群号
+            * `module_name`：插件模块名
+
+        返回:
+            * `Optional[bool]`：插件开关，为None时该群未注册此插件
+        """
+        await self._load_status()
+        index = self._index.get(module_name)
+        if index is None:
+            return None
+        bit = 1 << index
+        if not self._registered.get(group_id, 0) & bit:
+            return None
+        return bool(self._enabled.get(group_id, 0) & bit)
+
+    async def set_plugin_status(
+        self, group_id: int, module_name: str, status: bool
+    ) -> bool:
+        """
+        说明:
+            设置一个插件的开关状态，同时更新内存位图
+
+        参数:
+            * `group_id`：群号
+            * `module_name`：插件模块名
+            * `status`：开关
+
+        返回:
+            * `bool`：设置是否成功，未找到插件则不成功
+        """
+        await self._load_status()
+        flag = await PluginInfo.set_plugin_status(group_id, module_name, status)
+        if flag:
+            self._set_bit(group_id, module_name, status)
+        return flag
+
+    async def delete_group(self, group_id: int):
+        """
+        说明:
+            注销一个群的所有插件，退群时使用
+
+        参数:
+            * `group_id`：群号
+        """
+        await PluginInfo.delete_group(group_id)
+        self._registered.pop(group_id, None)
+        self._enabled.pop(group_id, None)
 
     def get_module_name(self, plugin_name: str) -> Optional[str]:
         """
@@ -5,7 +5,6 @@ from nonebot.adapters.onebot.v11 import Message, MessageSegment
 from src.config import path_config
 from src.internal.plugin_manager import plugin_manager
 from src.modules.group_info import GroupInfo
-from src.modules.plugin_info import PluginInfo
 from src.modules.search_record import SearchRecord
 from src.modules.user_info import UserInfo
 from src.params import NoticeType
@@ -83,7 +82,7 @@ async def bot_group_quit(group_id):
     # 注销group_inofo
     await GroupInfo.delete_group(group_id)
     # 注销plugin_info
-    await PluginInfo.delete_group(group_id)
+    await plugin_manager.delete_group(group_id)
     # 注销user_info
     await UserInfo.delete_group(group_id)
     # 注销search_record
@@ -1,8 +1,9 @@
 from pathlib import Path
 
-from httpx import AsyncClient
 from nonebot.utils import run_sync
 
+from src.utils.client import client
+
 
 class ImageHandler:
     """
@@ -32,13 +33,12 @@ class ImageHandler:
         返回:
             * `bool`：保存是否成功
         """
-        async with AsyncClient() as client:
-            try:
-                req = await client.get(url=url)
-                await cls._save_image(file_name, req.read())
-                return True
-            except Exception:
-                return False
+        try:
+            req = await client.get(url=url)
+            await cls._save_image(file_name, req.read())
+            return True
+        except Exception:
+            return False
 
     @classmethod
     @run_sync
@@ -7,7 +7,6 @@ from nonebot.plugin import PluginMetadata
 
 from src.internal.plugin_manager import plugin_manager
 from src.modules.group_info import GroupInfo
-from src.modules.plugin_info import PluginInfo
 from src.params import GroupSetting, PluginConfig, group_matcher_group
 from src.utils.log import logger
 
@@ -27,7 +26,7 @@ async def _(matcher: Matcher, event: GroupMessageEvent):
     # 检测插件是否注册
     group_id = event.group_id
     module_name = matcher.plugin_name
-    status = await PluginInfo.get_plugin_status(group_id, module_name)
+    status = await plugin_manager.get_plugin_status(group_id, module_name)
     if status is None:
         # 跳过未注册的插件
         return
@@ -149,7 +148,7 @@ async def _(
         f"<y>插件管理</y> | <g>群{event.group_id}</g> | 插件开关 | {plugin_name} | {'打开' if status else '关闭'}"
     )
 
-    flag = await PluginInfo.set_plugin_status(event.group_id, module_name, status)
+    flag = await plugin_manager.set_plugin_status(event.group_id, module_name, status)
     if flag:
         msg = f"设置成功！\n插件[{plugin_name}]当前已 {'打开' if status else '关闭'}"
     else:
@@ -1,19 +1,22 @@
 import asyncio
 import random
+import time
 
 from nonebot import get_driver, on
 from nonebot.adapters.onebot.v11 import Bot, PrivateMessageEvent
 from nonebot.plugin import PluginMetadata
 from tortoise import Tortoise
 
+from src.internal.jx3api import SERVER_ALIAS_FILE, JX3API, load_server_alias
 from src.internal.plugin_manager import plugin_manager
 from src.modules.group_info import GroupInfo
 from src.modules.user_info import UserInfo
 from src.params import PluginConfig, admin_matcher_group
-from src.utils.browser import browser
+from src.utils.browser import browser, update_notice
+from src.utils.client import close_client
 from src.utils.log import logger
 from src.utils.utils import GroupList_Async
-from ._jx3_event import RecvEvent, WsNotice
+from ._jx3_event import NewsRecvEvent, RecvEvent, ServerStatusEvent, WsNotice
 from .data_source import get_ws_status, ws_init
 from .jx3_websocket import ws_client
 
@@ -25,6 +28,13 @@ __plugin_meta__ = PluginMetadata(
 )
 
 driver = get_driver()
+api = JX3API()
+
+REGISTER_CONCURRENCY = 8
+"""bot连接时同时注册的群数"""
+
+_background_tasks: set[asyncio.Task] = set()
+"""后台运行的task，保留引用避免执行中被回收"""
 
 
 # ----------------------------------------------------------------
@@ -37,25 +47,52 @@ async def _(bot: Bot):
     """机器人连接处理"""
     # 获取群
     logger.info(f"<y>Bot {bot.self_id}</y> 已连接，正在注册...")
+    time_start = time.perf_counter()
     group_list = await bot.get_group_list()
-    for group in group_list:
+    semaphore = asyncio.Semaphore(REGISTER_CONCURRENCY)
+    done = 0
+    members = 0
+    last_log = time_start
+
+    async def register(group: dict):
+        nonlocal done, members, last_log
         group_id: int = group["group_id"]
         group_name: str = group["group_name"]
-        # 注册群信息
-        await GroupInfo.group_init(group_id, group_name)
-        # 注册插件
-        await plugin_manager.load_plugins(group_id)
-        # 注册成员信息
-        member_list = await bot.get_group_member_list(group_id=group_id)
-        for one_member in member_list:
-            user_id = one_member["user_id"]
-            user_name = (
-                one_member["nickname"]
-                if one_member["card"] == ""
-                else one_member["card"]
+        async with semaphore:
+            # 注册群信息
+            await GroupInfo.group_init(group_id, group_name)
+            # 注册插件
+            await plugin_manager.load_plugins(group_id)
+            # 注册成员信息
+            member_list = await bot.get_group_member_list(group_id=group_id)
+            users = {
+                one_member["user_id"]: (
+                    one_member["nickname"]
+                    if one_member["card"] == ""
+                    else one_member["card"]
+                )
+                for one_member in member_list
+            }
+            members += await UserInfo.bulk_user_init(group_id, users)
+        done += 1
+        now = time.perf_counter()
+        if now - last_log >= 5:
+            last_log = now
+            logger.info(
+                f"<y>Bot {bot.self_id}</y> 注册中：{done}/{len(group_list)} 个群，"
+                f"{members} 名成员"
             )
-            await UserInfo.user_init(user_id, group_id, user_name)
-    logger.info(f"<y>Bot {bot.self_id}</y> 注册完毕。")
+
+    results = await asyncio.gather(
+        *(register(group) for group in group_list), return_exceptions=True
+    )
+    for group, result in zip(group_list, results):
+        if isinstance(result, Exception):
+            logger.error(f"<r>注册群{group['group_id']}失败</r>：{str(result)}")
+    logger.info(
+        f"<y>Bot {bot.self_id}</y> 注册完毕，共 {done} 个群，{members} 名成员，"
+        f"耗时 {time.perf_counter() - time_start:.1f} 秒。"
+    )
 
 
 @driver.on_bot_disconnect
@@ -86,6 +123,10 @@ async def _():
     await Tortoise.close_connections()
     logger.info("<g>数据库关闭成功。</g>")
 
+    if api.disk_cache:
+        api.disk_cache.close()
+    await close_client()
+
     logger.info("<y>关闭ws链接...</y>")
     await ws_client.close()
     logger.info("<g>ws链接关闭成功。</g>")
@@ -97,6 +138,9 @@ async def _():
 check_ws = admin_matcher_group.on_regex(pattern=r"^查看连接$")
 connect_ws = admin_matcher_group.on_regex(pattern=r"^连接服务$")
 close_ws = admin_matcher_group.on_regex(pattern=r"^关闭连接$")
+check_api = admin_matcher_group.on_regex(pattern=r"^查看接口$")
+reload_alias = admin_matcher_group.on_regex(pattern=r"^重载区服$")
+check_render = admin_matcher_group.on_regex(pattern=r"^查看渲染$")
 
 
 @check_ws.handle()
@@ -109,6 +153,86 @@ async def _(event: PrivateMessageEvent):
     await check_ws.finish(msg)
 
 
+@check_api.handle()
+async def _(event: PrivateMessageEvent):
+    """查看jx3api接口状态"""
+    cache = api.cache
+    msg = (
+        "jx3api > 接口状态\n"
+        f"请求：{api.requested}，合并：{api.coalesced}\n"
+        f"缓存命中：{cache.hits}，旧数据：{cache.stale_hits}，未命中：{cache.misses}"
+    )
+    for family, limiter in api.limiters.items():
+        if limiter.rate > 0:
+            msg += (
+                f"\n{family}限流：排队{limiter.queued}次，"
+                f"共等待{limiter.waited:.1f}秒，拒绝{limiter.rejected}次"
+            )
+    state_name = {"closed": "正常", "open": "熔断", "half_open": "试探"}
+    for endpoint, breaker in api.breakers.items():
+        if breaker.state != "closed" or breaker.failures:
+            msg += (
+                f"\n{endpoint}：{state_name[breaker.state]}"
+                f"（连续失败{breaker.failures}次）"
+            )
+    await check_api.finish(msg)
+
+
+@check_render.handle()
+async def _(event: PrivateMessageEvent):
+    """查看图片渲染状态"""
+    scheduler = browser.scheduler
+    msg = f"渲染 > 正在渲染：{scheduler.running}，排队：{scheduler.queued}"
+    for priority, stat in scheduler.stats.items():
+        if stat.count or stat.rejected:
+            count = stat.count or 1
+            msg += (
+                f"\n{priority.name}：{stat.count}次，"
+                f"平均排队{stat.wait / count * 1000:.0f}ms"
+                f"（最长{stat.wait_max * 1000:.0f}ms），"
+                f"平均渲染{stat.render / count * 1000:.0f}ms，拒绝{stat.rejected}次"
+            )
+    for worker in browser.workers:
+        state = "正常" if worker.ready.is_set() else "重启中"
+        msg += (
+            f"\n渲染进程{worker.index}：{state}，"
+            f"使用中页面{worker.load}，重启{worker.restarts}次"
+        )
+    cache = browser.cache
+    if cache is None:
+        msg += "\n缓存：未开启"
+    else:
+        msg += (
+            f"\n缓存命中：{cache.hits}，未命中：{cache.misses}，"
+            f"节省：{cache.saved_bytes / 1024 / 1024:.1f}MB"
+        )
+    for name, stat in browser.sizes.items():
+        msg += (
+            f"\n{name}：{stat.count}张，平均{stat.total / stat.count / 1024:.0f}KB，"
+            f"p50 {stat.percentile(50) / 1024:.0f}KB，"
+            f"p90 {stat.percentile(90) / 1024:.0f}KB"
+        )
+    assets = browser.assets
+    if assets is not None:
+        msg += (
+            f"\n本地资源命中：{assets.local_hits}，"
+            f"远程图片命中：{assets.icon_hits}，下载：{assets.icon_misses}"
+        )
+    await check_render.finish(msg)
+
+
+@reload_alias.handle()
+async def _(event: PrivateMessageEvent):
+    """重新加载区服别名文件"""
+    if not SERVER_ALIAS_FILE.exists():
+        await reload_alias.finish(f"未找到区服别名文件：{SERVER_ALIAS_FILE}")
+    try:
+        count = load_server_alias(SERVER_ALIAS_FILE)
+    except Exception as e:
+        await reload_alias.finish(f"加载区服别名失败：{str(e)}")
+    await reload_alias.finish(f"已加载 {count} 个区服的别名。")
+
+
 @connect_ws.handle()
 async def _(event: PrivateMessageEvent):
     """连接服务器"""
@@ -145,6 +269,15 @@ ws_notice = on(type="WsNotice", priority=2, block=True)
 @ws_recev.handle()
 async def _(bot: Bot, event: RecvEvent):
     """ws推送事件"""
+    if isinstance(event, ServerStatusEvent) and event.status:
+        # 开服后预热缓存，避免开服后的第一波查询等待
+        task = asyncio.create_task(api.warm_up([event.server]))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+    elif isinstance(event, NewsRecvEvent):
+        # 新闻推送时更新公告可能已变化，在后台刷新截图，不阻塞推送
+        update_notice.refresh_later()
+
     group_list = await bot.get_group_list()
     logger.info(f"<g>加载ws事件{RecvEvent}。</g>")
     async for group_id in GroupList_Async(group_list):
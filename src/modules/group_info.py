@@ -13,6 +13,13 @@ def encode_text(text: str):
     return json.dumps(data, ensure_ascii=False)
 
 
+_group_cache: dict[int, "GroupInfo"] = {}
+"""
+群设置缓存，群号：记录，读取时不再查询数据库。
+修改群设置的接口都通过缓存中的记录写入，保持一致，直接修改数据库后需要调用`GroupInfo.invalidate_cache`
+"""
+
+
 class GroupInfo(Model):
     """群信息处理"""
 
@@ -65,6 +72,47 @@ class GroupInfo(Model):
         table = "group_info"
         table_description = "管理QQ群信息"
 
+    @classmethod
+    async def _get_record(
+        cls, group_id: int, create: bool = True
+    ) -> Optional["GroupInfo"]:
+        """
+        说明:
+            获取群记录，优先使用缓存
+
+        参数:
+            * `group_id`：群号
+            * `create`：不存在时是否创建
+
+        返回:
+            * `Optional[GroupInfo]`：群记录，不创建时可能为None
+        """
+        record = _group_cache.get(group_id)
+        if record is not None:
+            return record
+        if create:
+            record, _ = await cls.get_or_create(group_id=group_id)
+        else:
+            record = await cls.get_or_none(group_id=group_id)
+            if record is None:
+                return None
+        # 并发查询时以先缓存的记录为准
+        return _group_cache.setdefault(group_id, record)
+
+    @classmethod
+    def invalidate_cache(cls, group_id: Optional[int] = None):
+        """
+        说明:
+            清除群设置缓存，下次读取时重新查询数据库
+
+        参数:
+            * `group_id`：群号，为None时清除所有群
+        """
+        if group_id is None:
+            _group_cache.clear()
+        else:
+            _group_cache.pop(group_id, None)
+
     @classmethod
     async def group_init(cls, group_id: int, group_name: str):
         """
@@ -75,7 +123,7 @@ class GroupInfo(Model):
             * `group_id`：群号
             * `group_name`：群名
         """
-        record, _ = await cls.get_or_create(group_id=group_id)
+        record = await cls._get_record(group_id)
         record.group_name = group_name
         await record.save(update_fields=["group_name"])
 
@@ -91,7 +139,7 @@ class GroupInfo(Model):
         返回:
             * `bool`：机器人是否开启
         """
-        record = await cls.get_or_none(group_id=group_id)
+        record = await cls._get_record(group_id, create=False)
         return record.robot_status
 
     @classmethod
@@ -106,7 +154,7 @@ class GroupInfo(Model):
         返回:
             * `int`：当天已签到数量
         """
-        record, _ = await cls.get_or_create(group_id=group_id)
+        record = await cls._get_record(group_id)
         record.sign_nums += 1
         await record.save(update_fields=["sign_nums"])
         return record.sign_nums
@@ -123,7 +171,7 @@ class GroupInfo(Model):
         返回:
             * `str`：服务器名
         """
-        record = await cls.get_or_none(group_id=group_id)
+        record = await cls._get_record(group_id, create=False)
         return record.server
 
     @classmethod
@@ -139,7 +187,7 @@ class GroupInfo(Model):
         返回:
             * `bool`：开关状态
         """
-        record = await cls.get_or_none(group_id=group_id)
+        record = await cls._get_record(group_id, create=False)
         match setting_type:
             case GroupSetting.进群通知:
                 status = record.welcome_status
@@ -174,7 +222,7 @@ class GroupInfo(Model):
             * `setting_type`：群设置枚举
             * `status`：开关状态
         """
-        record, _ = await cls.get_or_create(group_id=group_id)
+        record = await cls._get_record(group_id)
         match setting_type:
             case GroupSetting.进群通知:
                 record.welcome_status = status
@@ -206,6 +254,8 @@ class GroupInfo(Model):
             重置所有群签到人数
         """
         await cls.all().update(sign_nums=0)
+        for record in _group_cache.values():
+            record.sign_nums = 0
 
     @classmethod
     async def bind_server(cls, group_id: int, server: str):
@@ -217,17 +267,28 @@ class GroupInfo(Model):
             * `group_id`：群号
             * `server`：服务器名
         """
-        record, _ = await cls.get_or_create(group_id=group_id)
+        record = await cls._get_record(group_id)
         record.server = server
         await record.save(update_fields=["server"])
 
+    @classmethod
+    async def get_bind_servers(cls) -> list[str]:
+        """
+        说明:
+            获取所有群绑定过的服务器，去重
+
+        返回:
+            * `list[str]`：服务器名列表
+        """
+        return await cls.all().distinct().values_list("server", flat=True)
+
     @classmethod
     async def set_activity(cls, group_id: int, activity: int):
         """
         说明:
             给群设置活跃值
         """
-        record, _ = await cls.get_or_create(group_id=group_id)
+        record = await cls._get_record(group_id)
         record.robot_active = activity
         await record.save(update_fields=["robot_active"])
 
@@ -237,7 +298,7 @@ class GroupInfo(Model):
         说明:
             设置某个群机器人总开关
         """
-        record, _ = await cls.get_or_create(group_id=group_id)
+        record = await cls._get_record(group_id)
         record.robot_status = status
         await record.save(update_fields=["robot_status"])
 
@@ -265,7 +326,7 @@ class GroupInfo(Model):
                 * `ws_horse` `bool`：ws抓马推送开关
                 * `ws_fuyao` `bool`：ws扶摇推送开关
         """
-        record, _ = await cls.get_or_create(group_id=group_id)
+        record = await cls._get_record(group_id)
         return {
             "robot_status": record.robot_status,
             "sign_nums": record.sign_nums,
@@ -296,7 +357,7 @@ class GroupInfo(Model):
             * `message`：通知内容
         """
         _message = json.dumps(message, ensure_ascii=False)
-        record, _ = await cls.get_or_create(group_id=group_id)
+        record = await cls._get_record(group_id)
         match notice_type:
             case NoticeType.晚安通知:
                 record.goodnight_text = _message
@@ -319,7 +380,7 @@ class GroupInfo(Model):
         返回:
             * `list[dict]`：消息数组
         """
-        record, _ = await cls.get_or_create(group_id=group_id)
+        record = await cls._get_record(group_id)
         match notice_type:
             case NoticeType.晚安通知:
                 data = record.goodnight_text
@@ -339,6 +400,7 @@ class GroupInfo(Model):
             * `group_id`：群号
         """
         await cls.filter(group_id=group_id).delete()
+        cls.invalidate_cache(group_id)
 
     @classmethod
     async def get_group_list(cls) -> list[dict]:
@@ -376,7 +438,7 @@ class GroupInfo(Model):
         返回:
             * `Optional[str]`：群名
         """
-        record = await cls.get_or_none(group_id=group_id)
+        record = await cls._get_record(group_id, create=False)
         if record:
             return record.group_name
         return None
@@ -393,5 +455,5 @@ class GroupInfo(Model):
         返回:
             * `int`：活跃值，1-99
         """
-        record, _ = await cls.get_or_create(group_id=group_id)
+        record = await cls._get_record(group_id)
         return record.robot_active
@@ -18,6 +18,7 @@ class PluginInfo(Model):
     class Meta:
         table = "plugin_info"
         table_description = "用来记录插件开关"
+        unique_together = (("group_id", "module_name"),)
 
     @classmethod
     async def check_inited(cls, group_id: int, module_name: str) -> bool:
@@ -111,6 +112,17 @@ class PluginInfo(Model):
             .values("module_name", "status")
         )
 
+    @classmethod
+    async def get_all_status(cls) -> list[tuple[int, str, bool]]:
+        """
+        说明:
+            获取所有群的所有插件开关状态，用于加载插件状态缓存
+
+        返回:
+            * `list[tuple[int, str, bool]]`：（群号，插件模块名，插件开关）列表
+        """
+        return await cls.all().values_list("group_id", "module_name", "status")
+
     @classmethod
     async def delete_group(cls, group_id: int):
         """
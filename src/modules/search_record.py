@@ -20,6 +20,7 @@ class SearchRecord(Model):
     class Meta:
         table = "search_record"
         table_description = "记录查询次数"
+        unique_together = (("group_id", "app_name"),)
 
     @classmethod
     async def get_search_time(cls, group_id: int, app_name: str) -> int:
@@ -3,6 +3,7 @@ from datetime import date
 
 from tortoise import fields
 from tortoise.models import Model
+from tortoise.transactions import in_transaction
 
 
 class UserInfo(Model):
@@ -29,6 +30,7 @@ class UserInfo(Model):
     class Meta:
         table = "user_info"
         table_description = "管理用户"
+        unique_together = (("group_id", "user_id"),)
 
     @classmethod
     async def user_init(cls, user_id: int, group_id: int, user_name: str):
@@ -45,6 +47,37 @@ class UserInfo(Model):
         record.user_name = user_name
         await record.save()
 
+    @classmethod
+    async def bulk_user_init(
+        cls, group_id: int, users: dict[int, str], batch_size: int = 500
+    ) -> int:
+        """
+        说明:
+            批量注册一个群的用户并刷新昵称，已存在的用户只更新昵称，
+            每批在一个事务中写入
+
+        参数:
+            * `group_id`：群号
+            * `users`：用户QQ号：用户昵称
+            * `batch_size`：每批写入的数量
+
+        返回:
+            * `int`：写入的用户数
+        """
+        records = [
+            cls(group_id=group_id, user_id=user_id, user_name=user_name)
+            for user_id, user_name in users.items()
+        ]
+        for start in range(0, len(records), batch_size):
+            async with in_transaction() as connection:
+                await cls.bulk_create(
+                    records[start : start + batch_size],
+                    on_conflict=["group_id", "user_id"],
+                    update_fields=["user_name"],
+                    using_db=connection,
+                )
+        return len(records)
+
     @classmethod
     async def sign_in(
         cls,
@@ -6,7 +6,6 @@ from enum import Enum
 from pathlib import Path
 from typing import NoReturn, Optional
 
-import requests
 from PIL import Image
 from nonebot.adapters.onebot.v11 import GroupMessageEvent, MessageSegment
 from nonebot.matcher import Matcher
@@ -21,8 +20,10 @@ from src.modules.group_info import GroupInfo
 from src.modules.search_record import SearchRecord
 from src.modules.ticket_info import TicketInfo
 from src.params import PluginConfig, user_matcher_group
-from src.utils.browser import browser
+from src.utils.browser import browser, update_notice
+from src.utils.client import client
 from src.utils.log import logger
+from src.utils.scheduler import scheduler
 from . import data_source as source
 from .config import JX3PROFESSION
 
@@ -435,7 +436,7 @@ async def _(event: GroupMessageEvent) -> NoReturn:
         await server_query.finish(msg)
     logger.info(f"<y> 调用jx3api查询百战信息</y>")
     data = response.data
-    request = requests.get(data['url'])
+    request = await client.get(data['url'])
     img = Image.open(io.BytesIO(request.content))
     base_path = os.path.abspath('')
     base_path = os.path.join(base_path, 'template')
@@ -587,8 +588,7 @@ async def _(event: GroupMessageEvent, name: str = get_value()) -> NoReturn:
 async def _(event: GroupMessageEvent) -> NoReturn:
     """更新公告"""
     logger.info(f"<y>群{event.group_id}</y> | <g>{event.user_id}</g> | 更新公告查询")
-    url = "https://jx3.xoyo.com/launcher/update/latest.html"
-    img = await browser.get_image_from_url(url=url, width=130, height=480)
+    img = await update_notice.get()
     msg = MessageSegment.image(img)
     log = f"群{event.group_id} | 查询更新公告"
     logger.info(log)
@@ -948,3 +948,28 @@ async def _(event: GroupMessageEvent) -> NoReturn:
     pagename = "查询帮助.html"
     img = await browser.template_to_image(pagename=pagename, flag=flag)
     await help.finish(MessageSegment.image(img))
+
+
+# ----------------------------------------------------------------
+#   定时任务，预热常用查询缓存
+# ----------------------------------------------------------------
+
+
+@scheduler.scheduled_job("cron", hour=7, minute=1)
+@scheduler.scheduled_job("cron", minute="*/30")
+async def _():
+    """预热已绑定服务器的日常、金价、排行缓存"""
+    servers = await GroupInfo.get_bind_servers()
+    logger.debug(f"<y>缓存预热</y> | 服务器：{servers}")
+    await api.warm_up(servers)
+
+
+# ----------------------------------------------------------------
+#   更新公告截图，后台刷新，内容变化时才重新截图
+# ----------------------------------------------------------------
+
+
+@scheduler.scheduled_job("interval", minutes=10)
+async def _():
+    """定时刷新更新公告"""
+    await update_notice.refresh()
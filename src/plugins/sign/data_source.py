@@ -1,18 +1,15 @@
 import random
 from datetime import date
 
-from httpx import AsyncClient
 from nonebot.adapters.onebot.v11 import Message, MessageSegment
 
 from src.modules.group_info import GroupInfo
 from src.modules.user_info import UserInfo
+from src.utils.client import client
 from src.utils.log import logger
 
 from .config import FRIENDLY_ADD, GOLD_BASE, LUCKY_GOLD, LUCKY_MAX, LUCKY_MIN
 
-client = AsyncClient()
-"""异步请求客户端"""
-
 
 async def get_sign_in(user_id: int, group_id: int) -> Message:
     """
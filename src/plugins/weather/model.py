@@ -6,6 +6,7 @@ from httpx import AsyncClient
 from pydantic import BaseModel
 
 from src.config import weather_config
+from src.utils.client import client
 from src.utils.log import logger
 
 
@@ -190,7 +191,7 @@ class Weather:
                 self.weather_warning_url = "https://api.qweather.com/v7/warning/now"
                 self.air_url = "https://api.qweather.com/v7/air/now"
                 self.days_type = "7d"
-        self.client = AsyncClient()
+        self.client = client
 
     @classmethod
     def handle_days(cls, daily: list[Daily]) -> list[Daily]:
@@ -1,28 +1,855 @@
+import asyncio
+import hashlib
+import mimetypes
 import os
-import shutil
 import time
+from collections import OrderedDict, deque
 from contextlib import asynccontextmanager
+from enum import IntEnum
+from functools import partial
+from io import BytesIO
 from pathlib import Path
-from typing import AsyncIterator, Optional
+from typing import AsyncIterator, Awaitable, Callable, Literal, NamedTuple, Optional
+from urllib.parse import unquote, urlsplit
 
 import jinja2
-from playwright.async_api import Browser, Error, Page, async_playwright
+from httpx import HTTPError
+from nonebot.adapters.onebot.v11 import GroupMessageEvent, MessageEvent
+from nonebot.matcher import current_event, current_matcher
+from nonebot.utils import run_sync
+from playwright.async_api import (
+    Browser,
+    Error,
+    Page,
+    Route,
+    TimeoutError as PlaywrightTimeoutError,
+    async_playwright,
+)
 
-from src.config import path_config
+from src.config import browser_config, path_config
+from .client import client
 from .log import logger
 
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
 
-class MyBrowser:
-    """自定义浏览类"""
+RENDER_ORIGIN = "http://render.jx3bot/"
+"""
+渲染页面使用的虚拟域名，请求由route拦截，模板中的相对路径从template目录读取
+"""
+
+READY_SCRIPT = """
+() => window.__ready !== false && !document.querySelector('[data-ready="false"]')
+"""
+"""
+模板的渲染完成信号，需要异步渲染的模板先设置`window.__ready = false`，
+或给元素加上`data-ready="false"`，渲染完成后再改为true，没有设置的模板视为已完成
+"""
+
+WAIT_RESOURCE_SCRIPT = """
+async (budget) => {
+    const wait = (element, done) => done ? null : new Promise((resolve) => {
+        element.addEventListener("load", resolve, { once: true });
+        element.addEventListener("error", resolve, { once: true });
+        setTimeout(resolve, budget);
+    });
+    const links = document.querySelectorAll('link[rel="stylesheet"]');
+    await Promise.all([
+        ...Array.from(links, (link) => wait(link, link.sheet)),
+        ...Array.from(document.images, (img) => wait(img, img.complete)),
+    ]);
+    await document.fonts.ready;
+}
+"""
+"""等待样式和图片加载，单个资源最多等待budget毫秒，超时的图片不再等待"""
+
+
+class OutputOption(NamedTuple):
+    """图片输出设置"""
+
+    format: Literal["jpeg", "png", "webp"] = "jpeg"
+    """图片格式，webp需要安装Pillow"""
+    quality: int = 0
+    """jpeg和webp的质量，为0时使用默认设置"""
+    max_width: int = 0
+    """最大宽度，超出时等比缩小，为0时不限制，需要安装Pillow"""
+    quantize: bool = False
+    """png是否减少为256色，适合颜色简单的表格页面，需要安装Pillow"""
+
+
+_PALETTE_OUTPUT = OutputOption(format="png", quantize=True)
+
+TEMPLATE_OUTPUT: dict[str, OutputOption] = {
+    "查询帮助.html": _PALETTE_OUTPUT,
+    "管理员帮助.html": _PALETTE_OUTPUT,
+    "超级用户帮助.html": _PALETTE_OUTPUT,
+    "菜单.html": _PALETTE_OUTPUT,
+    "群列表.html": _PALETTE_OUTPUT,
+    "好友列表.html": _PALETTE_OUTPUT,
+    "个人排行.html": _PALETTE_OUTPUT,
+    "帮会排行.html": _PALETTE_OUTPUT,
+    "试炼排行.html": _PALETTE_OUTPUT,
+    "资历排行.html": _PALETTE_OUTPUT,
+}
+"""各模板的输出设置，未设置的模板使用默认jpeg"""
+
+URL_OUTPUT = OutputOption()
+"""网页截图的输出设置"""
+
+
+class SizeStat:
+    """单个模板的图片大小统计"""
+
+    __slots__ = ("count", "total", "recent")
+
+    def __init__(self):
+        self.count = 0
+        """图片数量"""
+        self.total = 0
+        """总大小"""
+        self.recent: deque[int] = deque(maxlen=200)
+        """最近的图片大小，用于计算分位数"""
+
+    def add(self, size: int):
+        self.count += 1
+        self.total += size
+        self.recent.append(size)
+
+    def percentile(self, percent: float) -> int:
+        """最近图片大小的分位数"""
+        values = sorted(self.recent)
+        if not values:
+            return 0
+        return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+@run_sync
+def _encode_image(img: bytes, option: OutputOption) -> bytes:
+    """
+    说明:
+        使用Pillow处理截图，缩小宽度、减少颜色并转换格式
+
+    参数:
+        * `img`：png格式的截图
+        * `option`：输出设置
+
+    返回:
+        * `bytes`：处理后的图片
+    """
+    image = Image.open(BytesIO(img))
+    if option.max_width and image.width > option.max_width:
+        height = round(image.height * option.max_width / image.width)
+        image = image.resize((option.max_width, height), Image.LANCZOS)
+    quality = option.quality or browser_config.image_quality
+    output = BytesIO()
+    match option.format:
+        case "png":
+            if option.quantize:
+                # 2为FASTOCTREE，颜色简单的页面几乎看不出差别
+                image = image.convert("RGB").quantize(colors=256, method=2)
+            image.save(output, format="PNG")
+        case "webp":
+            image.save(output, format="WEBP", quality=quality)
+        case _:
+            image.convert("RGB").save(output, format="JPEG", quality=quality)
+    return output.getvalue()
+
+
+class PagePool:
+    """
+    页面池，预先创建的页面循环使用，避免每次渲染都新建和关闭页面
+    """
+
+    _create_page: Callable[[], Awaitable[Page]]
+    """创建新页面的方法"""
+    _idle: list[Page]
+    """空闲页面"""
+    _uses: dict[Page, int]
+    """页面使用次数"""
+    _semaphore: asyncio.Semaphore
+    """限制同时借出的页面数"""
+    size: int
+    """页面池大小"""
+    max_uses: int
+    """单个页面最多使用次数，超出后关闭重建"""
+    timeout: float
+    """等待空闲页面的超时时间"""
+
+    def __init__(
+        self,
+        create_page: Callable[[], Awaitable[Page]],
+        size: int,
+        max_uses: int,
+        timeout: float,
+    ):
+        self._create_page = create_page
+        self._idle = []
+        self._uses = {}
+        self._semaphore = asyncio.Semaphore(size)
+        self.size = size
+        self.max_uses = max_uses
+        self.timeout = timeout
+
+    async def _close_page(self, page: Page):
+        """关闭页面，忽略已关闭的错误"""
+        self._uses.pop(page, None)
+        try:
+            await page.close()
+        except Error:
+            pass
+
+    async def _get_idle_page(self) -> Page:
+        """获取一个健康的空闲页面，没有则新建"""
+        while self._idle:
+            page = self._idle.pop()
+            if not page.is_closed():
+                return page
+            self._uses.pop(page, None)
+        page = await self._create_page()
+        self._uses[page] = 0
+        return page
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Page]:
+        """
+        说明:
+            借出一个页面，使用上下文管理器，结束后自动归还。
+            页面池已满时排队等待，超时抛出`asyncio.TimeoutError`
+        """
+        await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+        page = None
+        healthy = False
+        try:
+            page = await self._get_idle_page()
+            yield page
+            healthy = True
+        finally:
+            if page is not None:
+                self._uses[page] = self._uses.get(page, 0) + 1
+                if (
+                    healthy
+                    and not page.is_closed()
+                    and self._uses[page] < self.max_uses
+                ):
+                    self._idle.append(page)
+                else:
+                    # 出错或使用次数过多的页面不再复用
+                    await self._close_page(page)
+            self._semaphore.release()
+
+    async def warm_up(self):
+        """
+        说明:
+            预先创建页面，填满页面池
+        """
+        while len(self._idle) < self.size:
+            page = await self._create_page()
+            self._uses[page] = 0
+            self._idle.append(page)
+
+    async def close(self):
+        """关闭所有空闲页面"""
+        idle, self._idle = self._idle, []
+        for page in idle:
+            await self._close_page(page)
+
+
+class FileCache:
+    """
+    磁盘文件缓存，每个键一个文件，超出大小时删除最久未使用的文件
+    """
+
+    path: Path
+    """缓存目录"""
+    max_size: int
+    """最大大小"""
+    _size: Optional[int]
+    """当前大小，第一次写入时统计"""
+
+    def __init__(self, path: Path, max_size: int):
+        self.path = path
+        self.max_size = max_size
+        self._size = None
+
+    @run_sync
+    def get(self, key: str) -> Optional[bytes]:
+        """读取缓存，读取后更新修改时间"""
+        file = self.path / key
+        try:
+            data = file.read_bytes()
+            os.utime(file)
+        except OSError:
+            return None
+        return data
+
+    @run_sync
+    def set(self, key: str, data: bytes):
+        """写入缓存"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        if self._size is None:
+            self._size = sum(file.stat().st_size for file in self.path.iterdir())
+        file = self.path / key
+        if file.exists():
+            return
+        file.write_bytes(data)
+        self._size += len(data)
+        if self._size <= self.max_size:
+            return
+        stats = ((file.stat(), file) for file in self.path.iterdir())
+        files = sorted((stat.st_mtime, stat.st_size, file) for stat, file in stats)
+        # 删除到容量的九成，避免每次写入都要清理
+        for _, size, file in files:
+            if self._size <= self.max_size * 0.9:
+                break
+            file.unlink(missing_ok=True)
+            self._size -= size
+
+
+class RenderCache:
+    """
+    渲染结果缓存，以模板名、模板修改时间和html内容的哈希为键，内存LRU加可选的磁盘缓存
+    """
+
+    _store: OrderedDict[str, bytes]
+    """内存缓存"""
+    _size: int
+    """内存缓存当前大小"""
+    max_size: int
+    """内存缓存最大大小"""
+    disk: Optional[FileCache]
+    """磁盘缓存，为None时不使用"""
+    hits: int
+    """命中次数"""
+    misses: int
+    """未命中次数"""
+    saved_bytes: int
+    """命中缓存返回的图片总大小"""
+
+    def __init__(self, max_size: int, disk: Optional[FileCache] = None):
+        self._store = OrderedDict()
+        self._size = 0
+        self.max_size = max_size
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self.saved_bytes = 0
+
+    @staticmethod
+    def make_key(pagename: str, mtime: float, html: str, option: OutputOption) -> str:
+        """生成缓存键"""
+        sha = hashlib.sha256()
+        sha.update(f"{pagename}\0{mtime}\0{tuple(option)}\0".encode("utf-8"))
+        sha.update(html.encode("utf-8"))
+        return sha.hexdigest()
+
+    def _set_memory(self, key: str, img: bytes):
+        """写入内存缓存，超出大小时淘汰最久未使用的"""
+        if len(img) > self.max_size:
+            return
+        old = self._store.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        self._store[key] = img
+        self._size += len(img)
+        while self._size > self.max_size:
+            _, evicted = self._store.popitem(last=False)
+            self._size -= len(evicted)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """
+        说明:
+            获取缓存图片，内存未命中时读取磁盘缓存
+
+        参数:
+            * `key`：缓存键
+
+        返回:
+            * `Optional[bytes]`：图片数据，未命中时为None
+        """
+        img = self._store.get(key)
+        if img is not None:
+            self._store.move_to_end(key)
+        elif self.disk is not None:
+            img = await self.disk.get(key)
+            if img is not None:
+                self._set_memory(key, img)
+        if img is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.saved_bytes += len(img)
+        return img
+
+    async def set(self, key: str, img: bytes):
+        """
+        说明:
+            缓存图片
+
+        参数:
+            * `key`：缓存键
+            * `img`：图片数据
+        """
+        self._set_memory(key, img)
+        if self.disk is not None:
+            try:
+                await self.disk.set(key, img)
+            except OSError as e:
+                logger.warning(f"<y>写入渲染缓存失败：</y>{str(e)}")
+
+    def clear(self):
+        """清空内存缓存"""
+        self._store.clear()
+        self._size = 0
+
+
+class AssetCache:
+    """
+    模板资源缓存，template下的css、图片等启动时读入内存，
+    模板中引用的远程图片缓存到磁盘，重复渲染不再请求网络
+    """
+
+    _assets: dict[str, tuple[bytes, str]]
+    """本地资源，相对路径：（数据，类型）"""
+    icons: Optional[FileCache]
+    """远程图片的磁盘缓存，为None时不缓存"""
+    _fetching: dict[str, asyncio.Task]
+    """正在下载的远程图片，避免同一张图片同时下载多次"""
+    local_hits: int
+    """本地资源命中次数"""
+    icon_hits: int
+    """远程图片命中次数"""
+    icon_misses: int
+    """远程图片下载次数"""
+
+    def __init__(self, icons: Optional[FileCache] = None):
+        self._assets = {}
+        self.icons = icons
+        self._fetching = {}
+        self.local_hits = 0
+        self.icon_hits = 0
+        self.icon_misses = 0
+
+    @staticmethod
+    def guess_type(path: str) -> str:
+        """根据后缀判断类型"""
+        content_type, _ = mimetypes.guess_type(urlsplit(path).path)
+        return content_type or "application/octet-stream"
+
+    @run_sync
+    def load(self, root: Path) -> int:
+        """
+        说明:
+            读取template下除模板外的所有文件到内存
+
+        参数:
+            * `root`：模板目录
+
+        返回:
+            * `int`：资源总大小
+        """
+        size = 0
+        for file in root.rglob("*"):
+            if not file.is_file() or file.suffix == ".html":
+                continue
+            data = file.read_bytes()
+            path = file.relative_to(root).as_posix()
+            self._assets[path] = (data, self.guess_type(path))
+            size += len(data)
+        return size
+
+    async def get_local(self, root: Path, path: str) -> Optional[tuple[bytes, str]]:
+        """
+        说明:
+            获取本地资源，不在内存中时从磁盘读取并缓存
+
+        参数:
+            * `root`：模板目录
+            * `path`：相对路径
+
+        返回:
+            * `Optional[tuple[bytes, str]]`：数据和类型，不存在时为None
+        """
+        asset = self._assets.get(path)
+        if asset is not None:
+            self.local_hits += 1
+            return asset
+        file = (root / path).resolve()
+        if not file.is_relative_to(root) or not file.is_file():
+            return None
+        data = await run_sync(file.read_bytes)()
+        asset = (data, self.guess_type(path))
+        self._assets[path] = asset
+        return asset
+
+    async def _fetch_icon(self, key: str, url: str) -> Optional[bytes]:
+        """下载远程图片并写入磁盘缓存"""
+        try:
+            res = await client.get(url, timeout=browser_config.image_timeout / 1000)
+        except HTTPError:
+            return None
+        if res.status_code != 200:
+            return None
+        self.icon_misses += 1
+        try:
+            await self.icons.set(key, res.content)
+        except OSError as e:
+            logger.warning(f"<y>写入图片缓存失败：</y>{str(e)}")
+        return res.content
+
+    async def get_icon(self, url: str) -> Optional[bytes]:
+        """
+        说明:
+            获取远程图片，优先使用磁盘缓存
+
+        参数:
+            * `url`：图片地址
+
+        返回:
+            * `Optional[bytes]`：图片数据，下载失败时为None
+        """
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        data = await self.icons.get(key)
+        if data is not None:
+            self.icon_hits += 1
+            return data
+        task = self._fetching.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_icon(key, url))
+            self._fetching[key] = task
+            task.add_done_callback(lambda _: self._fetching.pop(key, None))
+        return await asyncio.shield(task)
+
+
+class RenderPriority(IntEnum):
+    """渲染优先级，数值小的先渲染"""
+
+    QUERY = 0
+    """群聊中的查询"""
+    ADMIN = 1
+    """私聊中的管理命令，如群列表"""
+    BROADCAST = 2
+    """定时任务和推送等后台渲染"""
+
+
+class RenderBusyError(Exception):
+    """渲染排队已满"""
+
+
+class _RenderJob:
+    """排队中的渲染任务"""
+
+    __slots__ = ("future", "group")
+
+    def __init__(self, group: Optional[str]):
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.group = group
+
+
+class RenderStat:
+    """单个优先级的渲染统计"""
+
+    __slots__ = ("count", "wait", "wait_max", "render", "rejected")
+
+    def __init__(self):
+        self.count = 0
+        """渲染次数"""
+        self.wait = 0.0
+        """排队总时间"""
+        self.wait_max = 0.0
+        """最长排队时间"""
+        self.render = 0.0
+        """渲染总时间"""
+        self.rejected = 0
+        """排队已满被拒绝的次数"""
+
+
+class RenderScheduler:
+    """
+    渲染调度，限制同时渲染的数量。
+    排队的任务按优先级执行，同一优先级内各个群轮流执行，避免一个群刷屏占满队列
+    """
+
+    concurrency: int
+    """最多同时渲染的数量"""
+    max_queue: int
+    """排队的最大数量"""
+    max_group_queue: int
+    """单个群排队的最大数量"""
+    running: int
+    """正在渲染的数量"""
+    queued: int
+    """排队中的数量"""
+    _queues: dict[RenderPriority, OrderedDict[Optional[str], deque[_RenderJob]]]
+    """各优先级的队列，按群分开"""
+    stats: dict[RenderPriority, RenderStat]
+    """各优先级的统计"""
+
+    def __init__(self, concurrency: int, max_queue: int, max_group_queue: int):
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max_queue
+        self.max_group_queue = max_group_queue
+        self.running = 0
+        self.queued = 0
+        self._queues = {priority: OrderedDict() for priority in RenderPriority}
+        self.stats = {priority: RenderStat() for priority in RenderPriority}
+
+    def _dispatch(self):
+        """有空闲时按优先级和群轮流唤醒排队的任务"""
+        for queue in self._queues.values():
+            while queue and self.running < self.concurrency:
+                group, jobs = next(iter(queue.items()))
+                job = jobs.popleft()
+                # 轮到的群移到队尾
+                del queue[group]
+                if jobs:
+                    queue[group] = jobs
+                self.queued -= 1
+                if job.future.done():
+                    # 已被取消但还没来得及移除，跳过，移除时不会再计数
+                    continue
+                self.running += 1
+                job.future.set_result(None)
+
+    def _release(self):
+        """渲染结束，释放位置"""
+        self.running -= 1
+        self._dispatch()
 
-    _browser: Optional[Browser] = None
+    def _remove(self, priority: RenderPriority, job: _RenderJob):
+        """移除被取消的排队任务"""
+        queue = self._queues[priority]
+        jobs = queue.get(job.group)
+        if jobs is not None and job in jobs:
+            jobs.remove(job)
+            if not jobs:
+                del queue[job.group]
+            self.queued -= 1
+
+    async def _wait(self, priority: RenderPriority, group: Optional[str]):
+        """排队等待渲染位置"""
+        if self.running < self.concurrency and not self.queued:
+            self.running += 1
+            return
+
+        jobs = self._queues[priority].get(group)
+        group_queued = len(jobs) if jobs is not None else 0
+        if self.queued >= self.max_queue or group_queued >= self.max_group_queue:
+            self.stats[priority].rejected += 1
+            raise RenderBusyError
+
+        job = _RenderJob(group)
+        self._queues[priority].setdefault(group, deque()).append(job)
+        self.queued += 1
+        try:
+            await job.future
+        except asyncio.CancelledError:
+            if job.future.done() and not job.future.cancelled():
+                # 已经分配到位置后才被取消
+                self._release()
+            else:
+                self._remove(priority, job)
+            raise
+
+    async def run(
+        self,
+        func: Callable[[], Awaitable[bytes]],
+        priority: RenderPriority = RenderPriority.QUERY,
+        group: Optional[str] = None,
+    ) -> bytes:
+        """
+        说明:
+            排队执行渲染
+
+        参数:
+            * `func`：渲染方法
+            * `priority`：优先级
+            * `group`：所属的群，用于同一优先级内轮流执行
+
+        返回:
+            * `bytes`：图片数据
+        """
+        stat = self.stats[priority]
+        time_start = time.perf_counter()
+        await self._wait(priority, group)
+        time_render = time.perf_counter()
+        wait = time_render - time_start
+        stat.wait += wait
+        stat.wait_max = max(stat.wait_max, wait)
+        try:
+            return await func()
+        finally:
+            stat.count += 1
+            stat.render += time.perf_counter() - time_render
+            self._release()
+
+
+class BrowserWorker:
+    """
+    渲染进程，每个进程有自己的playwright和浏览器，以及自己的页面池。
+    浏览器崩溃断开后自动重启
+    """
+
+    index: int
+    """进程编号"""
+    browser: Optional[Browser]
     """Browser实例"""
     _playwright = None
     """playwright实例"""
+    _pool: Optional[PagePool]
+    """页面池"""
+    _setup_page: Callable[[Page], Awaitable[None]]
+    """新页面的初始化方法"""
+    _install: Callable[[], Awaitable[None]]
+    """浏览器启动失败时的安装方法"""
+    load: int
+    """正在使用的页面数"""
+    restarts: int
+    """重启次数"""
+    ready: asyncio.Event
+    """浏览器是否可用"""
+    _closing: bool
+    """是否正在关闭"""
+    _restart_task: Optional[asyncio.Task]
+    """后台重启的task，保留引用避免被回收"""
+
+    def __init__(
+        self,
+        index: int,
+        setup_page: Callable[[Page], Awaitable[None]],
+        install: Callable[[], Awaitable[None]],
+    ):
+        self.index = index
+        self.browser = None
+        self._pool = None
+        self._setup_page = setup_page
+        self._install = install
+        self.load = 0
+        self.restarts = 0
+        self.ready = asyncio.Event()
+        self._closing = False
+        self._restart_task = None
+
+    async def _new_page(self) -> Page:
+        """创建新页面，供页面池使用"""
+        page = await self.browser.new_page(
+            device_scale_factor=browser_config.device_scale_factor
+        )
+        await self._setup_page(page)
+        return page
+
+    async def start(self):
+        """
+        说明:
+            启动playwright和浏览器，并预先创建页面
+        """
+        self._playwright = await async_playwright().start()
+        try:
+            self.browser = await self._playwright.chromium.launch()
+        except Error:
+            await self._install()
+            self.browser = await self._playwright.chromium.launch()
+        self.browser.on("disconnected", self._on_disconnected)
+        self._pool = PagePool(
+            self._new_page,
+            size=browser_config.pool_size,
+            max_uses=browser_config.page_max_uses,
+            timeout=browser_config.pool_timeout,
+        )
+        await self._pool.warm_up()
+        self.ready.set()
+
+    def _on_disconnected(self, _: Browser):
+        """浏览器断开，不是主动关闭的话在后台重启"""
+        self.ready.clear()
+        if self._closing:
+            return
+        if self._restart_task is not None and not self._restart_task.done():
+            return
+        logger.error(f"<r>渲染进程{self.index}的浏览器已断开，正在重启...</r>")
+        self._restart_task = asyncio.create_task(self.restart())
+
+    async def _stop(self):
+        """关闭页面池、浏览器和playwright，忽略已断开的错误"""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+        if self.browser is not None:
+            try:
+                await self.browser.close()
+            except Error:
+                pass
+            self.browser = None
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Error:
+                pass
+            self._playwright = None
+
+    async def restart(self):
+        """
+        说明:
+            重启浏览器，失败时稍后重试
+        """
+        await self._stop()
+        while not self._closing:
+            try:
+                await self.start()
+            except Exception as e:
+                logger.error(f"<r>渲染进程{self.index}重启失败：</r>{str(e)}")
+                # 清理这次启动的playwright和浏览器，避免每次重试都遗留进程
+                await self._stop()
+                await asyncio.sleep(5)
+            else:
+                self.restarts += 1
+                logger.info(f"<g>渲染进程{self.index}已重启。</g>")
+                return
+
+    @asynccontextmanager
+    async def get_page(self) -> AsyncIterator[Page]:
+        """
+        说明:
+            从页面池借出页面，使用上下文管理器
+        """
+        self.load += 1
+        try:
+            async with self._pool.acquire() as page:
+                yield page
+        finally:
+            self.load -= 1
+
+    async def close(self):
+        """
+        说明:
+            关闭渲染进程
+        """
+        self._closing = True
+        await self._stop()
+
+
+class MyBrowser:
+    """自定义浏览类"""
+
+    workers: list[BrowserWorker] = []
+    """渲染进程"""
     _template_env: jinja2.Environment
     """jinja模板环境"""
-    _base_url: str = None
-    """模板基础路径"""
+    _template_path: Path = None
+    """模板目录"""
+    _templates: dict[str, tuple[jinja2.Template, float]] = {}
+    """已加载的模板和加载时模板文件的修改时间，用于渲染缓存的键"""
+    _compile_task: Optional[asyncio.Task] = None
+    """后台编译模板的task，保留引用避免被回收"""
+    cache: Optional[RenderCache] = None
+    """渲染结果缓存，关闭时为None"""
+    scheduler: RenderScheduler = None
+    """渲染调度"""
+    assets: Optional[AssetCache] = None
+    """模板资源缓存"""
+    sizes: dict[str, SizeStat] = {}
+    """各模板的图片大小统计"""
 
     def __new__(cls, *args, **kwargs):
         """单例"""
@@ -31,32 +858,99 @@ class MyBrowser:
             cls._instance = orig.__new__(cls, *args, **kwargs)
         return cls._instance
 
-    async def _launch_browser(self, **kwargs) -> Browser:
+    async def _handle_route(self, route: Route):
+        """
+        说明:
+            拦截页面的请求，虚拟域名下根路径返回空白页面，其他路径返回template下的文件；
+            渲染页面中的远程图片使用磁盘缓存；其他请求正常发出
+        """
+        request = route.request
+        url = request.url
+        if url.startswith(RENDER_ORIGIN):
+            path = unquote(urlsplit(url).path).lstrip("/")
+            if not path:
+                await route.fulfill(content_type="text/html", body="<html></html>")
+                return
+            asset = await self.assets.get_local(self._template_path, path)
+            if asset is None:
+                await route.fulfill(status=404)
+            else:
+                body, content_type = asset
+                await route.fulfill(body=body, content_type=content_type)
+            return
+
+        if (
+            self.assets.icons is not None
+            and request.resource_type == "image"
+            and url.startswith("http")
+            and request.frame.url.startswith(RENDER_ORIGIN)
+        ):
+            try:
+                body = await self.assets.get_icon(url)
+            except Exception as e:
+                logger.warning(f"<y>获取远程图片失败</y>：{url}，{str(e)}")
+                body = None
+            if body is None:
+                await route.abort()
+            else:
+                await route.fulfill(body=body, content_type=self.assets.guess_type(url))
+            return
+
+        await route.continue_()
+
+    async def _reset_page(self, page: Page):
         """
         说明:
-            初始化浏览器
+            页面回到虚拟域名下的空白页，之后直接set_content渲染
         """
-        return await self._playwright.chromium.launch(**kwargs)
+        await page.goto(RENDER_ORIGIN)
 
-    async def _get_browser(self, **kwargs) -> Browser:
+    async def _setup_page(self, page: Page):
         """
         说明:
-            获取浏览器
+            初始化新页面，拦截页面的请求
         """
-        return self._browser or await self.init(**kwargs)
+        await page.route("**/*", self._handle_route)
+        await self._reset_page(page)
 
     @asynccontextmanager
-    async def _get_new_page(self, **kwargs) -> AsyncIterator[Page]:
+    async def _get_page(self) -> AsyncIterator[Page]:
         """
         说明:
-            获取新页面，使用上下文管理器
+            从负载最小的渲染进程借出页面，使用上下文管理器
         """
-        browser = await self._get_browser()
-        page = await browser.new_page(**kwargs)
-        try:
+        workers = [worker for worker in self.workers if worker.ready.is_set()]
+        if workers:
+            worker = min(workers, key=lambda worker: worker.load)
+        else:
+            # 全部在重启中，等待第一个恢复
+            worker = self.workers[0]
+            await asyncio.wait_for(worker.ready.wait(), browser_config.pool_timeout)
+        async with worker.get_page() as page:
             yield page
-        finally:
-            await page.close()
+
+    async def _schedule(self, func: Callable[[], Awaitable[bytes]]) -> bytes:
+        """
+        说明:
+            通过渲染调度执行渲染，优先级和所属群从当前事件判断。
+            排队已满时，消息事件中直接回复繁忙并结束，其他情况抛出`RenderBusyError`
+        """
+        event = current_event.get(None)
+        if isinstance(event, GroupMessageEvent):
+            priority, group = RenderPriority.QUERY, f"group_{event.group_id}"
+        elif isinstance(event, MessageEvent):
+            priority, group = RenderPriority.ADMIN, f"user_{event.user_id}"
+        else:
+            # 定时任务、ws推送和通知事件
+            priority, group = RenderPriority.BROADCAST, None
+
+        try:
+            return await self.scheduler.run(func, priority, group)
+        except RenderBusyError:
+            logger.warning(f"<y>渲染排队已满</y>，优先级：{priority.name}，来源：{group}")
+            if not isinstance(event, MessageEvent):
+                raise
+            await current_matcher.get().finish("查询的人太多啦，请稍后再试")
 
     async def _install_browser(self):
         """
@@ -74,29 +968,129 @@ class MyBrowser:
         except SystemExit:
             pass
 
-    async def _html_to_pic(self, pagename: str, html: str, wait: int = 0) -> bytes:
+    def _get_option(self, option: OutputOption) -> OutputOption:
+        """
+        说明:
+            补全输出设置，未安装Pillow时只能使用浏览器直接输出的格式
+        """
+        if not option.quality:
+            option = option._replace(quality=browser_config.image_quality)
+        if Image is None:
+            if option.format == "webp":
+                option = option._replace(format="jpeg")
+            option = option._replace(max_width=0, quantize=False)
+        return option
+
+    async def _screenshot(self, target, option: OutputOption, **kwargs) -> bytes:
+        """
+        说明:
+            截图并按输出设置处理，需要Pillow处理的先截取无损的png
+
+        参数:
+            * `target`：截图的页面或元素
+            * `option`：输出设置
+            * `**kwargs`：screenshot的其他参数
+
+        返回:
+            * `bytes`：图片数据
+        """
+        if option.format == "webp" or option.max_width or option.quantize:
+            img = await target.screenshot(type="png", **kwargs)
+            return await _encode_image(img, option)
+        if option.format == "png":
+            return await target.screenshot(type="png", **kwargs)
+        return await target.screenshot(type="jpeg", quality=option.quality, **kwargs)
+
+    def _record_size(self, name: str, img: bytes):
+        """记录图片大小"""
+        stat = self.sizes.get(name)
+        if stat is None:
+            stat = self.sizes[name] = SizeStat()
+        stat.add(len(img))
+
+    async def _html_to_pic(
+        self, pagename: str, html: str, option: OutputOption, wait: int = 0
+    ) -> bytes:
         """
         说明:
             html转图片
 
         参数:
             * `pagename`: 页面名称，template下的文件名
-            * `html`: html的输出文本
+            * `html`: html的输出文本，相对路径基于template目录
+            * `option`: 输出设置
             * `wait`: 等待时间，对于有动画需求的，默认为0。
 
         返回:
             * bytes: 图片bytes, 可直接发送
         """
-        async with self._get_new_page(base_url=self._base_url) as page:
-            await page.goto(pagename)
-            await page.set_content(html, wait_until="networkidle")
-            await page.wait_for_timeout(wait)
+        async with self._get_page() as page:
+            # 复用的页面上window不会随set_content重置，先清除上一个模板留下的信号
+            await page.evaluate("delete window.__ready")
+            await page.set_content(html, wait_until="domcontentloaded")
+            ready = True
+            try:
+                await page.evaluate(WAIT_RESOURCE_SCRIPT, browser_config.image_timeout)
+                await page.wait_for_function(
+                    READY_SCRIPT, timeout=browser_config.ready_timeout
+                )
+            except PlaywrightTimeoutError:
+                ready = False
+                logger.warning(f"<y>等待模板渲染完成超时</y>：{pagename}")
+            if wait:
+                await page.wait_for_timeout(wait)
 
             # 选择标签main，这里是为了获得更好的图片，所以每个页面都需要有一个main标签
             element_handle = await page.query_selector("#main")
-            img_raw = await element_handle.screenshot(type="jpeg", quality=100)
+            img_raw = await self._screenshot(element_handle, option)
+            if not ready:
+                # 模板的脚本可能还在运行，关闭后页面池不再复用
+                await page.close()
+        self._record_size(pagename, img_raw)
         return img_raw
 
+    async def _compile_templates(self):
+        """
+        说明:
+            后台编译所有模板，第一次渲染时不用再解析模板
+        """
+        time_start = time.perf_counter()
+        names = self._template_env.list_templates(extensions=["html"])
+        for name in names:
+            try:
+                await self._get_template(name, in_thread=True)
+            except jinja2.TemplateError as e:
+                logger.error(f"<r>模板编译失败</r>：{name}，{str(e)}")
+        logger.info(
+            f"<g>模板编译完成</g>，共 {len(names)} 个，"
+            f"耗时 {time.perf_counter() - time_start:.2f} 秒"
+        )
+
+    async def _get_template(
+        self, template_name: str, in_thread: bool = False
+    ) -> tuple[jinja2.Template, float]:
+        """
+        说明:
+            获取模板，第一次加载或自动重新加载后记录模板文件的修改时间，之后渲染时不再读取文件信息
+
+        参数:
+            * `template_name`：模板名
+            * `in_thread`：是否在线程池中加载，后台编译时使用
+
+        返回:
+            * `tuple[jinja2.Template, float]`：模板，模板文件的修改时间
+        """
+        if in_thread:
+            template = await run_sync(self._template_env.get_template)(template_name)
+        else:
+            template = self._template_env.get_template(template_name)
+        loaded = self._templates.get(template_name)
+        if loaded is not None and loaded[0] is template:
+            return loaded
+        stat = await run_sync(Path(template.filename).stat)()
+        loaded = self._templates[template_name] = (template, stat.st_mtime)
+        return loaded
+
     async def _template_to_html(
             self,
             template_name: str,
@@ -114,37 +1108,74 @@ class MyBrowser:
             * `str`: html输出内容
         """
 
-        template = self._template_env.get_template(template_name)
+        template, _ = await self._get_template(template_name)
 
         return await template.render_async(**kwargs)
 
     async def init(self) -> Browser:
         """
         说明:
-            初始化playwright，需要在启动时使用
+            初始化playwright，需要在启动时使用。
+            设置了多个渲染进程时，每个进程启动一个浏览器
         """
         template_path = path_config.templates
-        path = Path(template_path).absolute()
-        self._base_url = f"file://{path}/"
-        self._playwright = await async_playwright().start()
+        self._template_path = Path(template_path).resolve()
+        if self.scheduler is None:
+            self.scheduler = RenderScheduler(
+                concurrency=browser_config.render_concurrency,
+                max_queue=browser_config.render_max_queue,
+                max_group_queue=browser_config.render_max_group_queue,
+            )
+        if browser_config.render_cache and self.cache is None:
+            disk = None
+            if browser_config.render_cache_persist:
+                disk = FileCache(
+                    Path(path_config.data) / "render_cache",
+                    browser_config.render_cache_persist_size * 1024 * 1024,
+                )
+            self.cache = RenderCache(
+                max_size=browser_config.render_cache_size * 1024 * 1024,
+                disk=disk,
+            )
+        if self.assets is None:
+            icons = None
+            if browser_config.icon_cache:
+                icons = FileCache(
+                    Path(path_config.data) / "icon_cache",
+                    browser_config.icon_cache_size * 1024 * 1024,
+                )
+            self.assets = AssetCache(icons)
+            if Image is None:
+                logger.warning("<y>未安装Pillow，图片只能输出为jpeg和png，无法缩放和减少颜色</y>")
+            size = await self.assets.load(self._template_path)
+            logger.info(f"<g>模板资源已加载</g>，共 {size / 1024 / 1024:.1f}MB")
+        bytecode_cache = None
+        if browser_config.template_bytecode_cache:
+            cache_path = Path(path_config.data) / "template_cache"
+            cache_path.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = jinja2.FileSystemBytecodeCache(str(cache_path))
         self._template_env = jinja2.Environment(
             loader=jinja2.FileSystemLoader(template_path),
             enable_async=True,
+            auto_reload=browser_config.template_auto_reload,
+            bytecode_cache=bytecode_cache,
         )
-        try:
-            self._browser = await self._launch_browser()
-        except Error:
-            await self._install_browser()
-            self._browser = await self._launch_browser()
-        return self._browser
+        self._compile_task = asyncio.create_task(self._compile_templates())
+        self.workers = [
+            BrowserWorker(index, self._setup_page, self._install_browser)
+            for index in range(max(1, browser_config.workers))
+        ]
+        # 第一个进程先启动，需要时安装浏览器，避免同时安装
+        await self.workers[0].start()
+        await asyncio.gather(*(worker.start() for worker in self.workers[1:]))
+        return self.workers[0].browser
 
     async def shutdown(self):
         """
         说明:
             关闭浏览器，在shutdown时使用
         """
-        await self._browser.close()
-        await self._playwright.stop()
+        await asyncio.gather(*(worker.close() for worker in self.workers))
 
     async def template_to_image(self, pagename: str, **kwargs) -> bytes:
         """
@@ -160,17 +1191,19 @@ class MyBrowser:
         """
 
         html = await self._template_to_html(template_name=pagename, **kwargs)
-        # 复制一个，避免造成后面生成的时候，报错提示 已关闭
-        temporary_name = time.strftime('%Y%m%d%H%M%S', time.localtime())
-        pagename_arr = pagename.split(".")
-        new_pagename = pagename_arr[0] + temporary_name + '.html'
-        base_path = os.path.abspath('')
-        base_path = os.path.join(base_path, 'template')
-        shutil.copy(os.path.join(base_path, pagename), os.path.join(base_path, new_pagename))
-        try:
-            return await self._html_to_pic(new_pagename, html)
-        finally:
-            os.remove(os.path.join(base_path, new_pagename))
+        option = self._get_option(TEMPLATE_OUTPUT.get(pagename, OutputOption()))
+        render = partial(self._html_to_pic, pagename, html, option)
+        if self.cache is None:
+            return await self._schedule(render)
+
+        # 模板重新加载后旧的缓存自然失效
+        _, mtime = await self._get_template(pagename)
+        key = self.cache.make_key(pagename, mtime, html, option)
+        img = await self.cache.get(key)
+        if img is None:
+            img = await self._schedule(render)
+            await self.cache.set(key, img)
+        return img
 
     async def get_image_from_url(self, url: str, width: int, height: int) -> bytes:
         """
@@ -185,15 +1218,124 @@ class MyBrowser:
         返回:
             * `bytes`：图片数据
         """
-        async with self._get_new_page() as page:
+        return await self._schedule(partial(self._url_to_pic, url, width, height))
+
+    async def _url_to_pic(self, url: str, width: int, height: int) -> bytes:
+        """
+        说明:
+            网页截图，参数同`get_image_from_url`
+        """
+        async with self._get_page() as page:
+            default_size = page.viewport_size
             viewport_size = {"width": width, "height": height}
             await page.set_viewport_size(viewport_size)
-            await page.goto(url)
-            await page.wait_for_load_state("networkidle")
-            img = await page.screenshot(type="jpeg", quality=100, full_page=True)
+            try:
+                await page.goto(url)
+                await page.wait_for_load_state("networkidle")
+                img = await self._screenshot(
+                    page, self._get_option(URL_OUTPUT), full_page=True
+                )
+            finally:
+                # 恢复页面，归还后其他渲染继续使用
+                await page.set_viewport_size(default_size)
+                await self._reset_page(page)
+        self._record_size("网页截图", img)
         return img
 
 
+class PageSnapshot:
+    """
+    网页截图缓存，后台定时刷新，网页内容没有变化时不重新截图
+    """
+
+    url: str
+    """网页地址"""
+    width: int
+    """网页宽度"""
+    height: int
+    """网页高度"""
+    image: Optional[bytes]
+    """最近一次的截图"""
+    html_hash: Optional[str]
+    """截图时网页内容的哈希"""
+    updated: float
+    """截图时间"""
+    _lock: asyncio.Lock
+    """避免同时刷新"""
+    _task: Optional[asyncio.Task]
+    """后台刷新任务"""
+
+    def __init__(self, url: str, width: int, height: int):
+        self.url = url
+        self.width = width
+        self.height = height
+        self.image = None
+        self.html_hash = None
+        self.updated = 0
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    def refresh_later(self):
+        """
+        说明:
+            在后台刷新截图，不等待完成，已有刷新任务时跳过
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_task())
+
+    async def _refresh_task(self):
+        """后台刷新，记录异常"""
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error(f"<r>网页截图刷新失败</r>：{self.url}，{str(e)}")
+
+    async def refresh(self, only_missing: bool = False) -> bool:
+        """
+        说明:
+            刷新截图，网页内容没有变化时跳过
+
+        参数:
+            * `only_missing`：只在还没有截图时刷新
+
+        返回:
+            * `bool`：是否重新截图
+        """
+        async with self._lock:
+            if only_missing and self.image is not None:
+                return False
+            try:
+                res = await client.get(self.url)
+                res.raise_for_status()
+            except HTTPError as e:
+                # 获取不到内容时照常截图
+                logger.warning(f"<y>获取网页内容失败</y>：{self.url}，{str(e)}")
+                html_hash = None
+            else:
+                html_hash = hashlib.sha256(res.content).hexdigest()
+                if html_hash == self.html_hash and self.image is not None:
+                    return False
+            self.image = await browser.get_image_from_url(
+                self.url, self.width, self.height
+            )
+            self.html_hash = html_hash
+            self.updated = time.time()
+            logger.debug(f"<g>网页截图已更新</g>：{self.url}")
+            return True
+
+    async def get(self) -> bytes:
+        """
+        说明:
+            获取截图，还没有截图时先截图
+
+        返回:
+            * `bytes`：图片数据
+        """
+        if self.image is None:
+            await self.refresh(only_missing=True)
+        return self.image
+
+
 browser = MyBrowser()
 """
 浏览器模块，使用playwright控制浏览器截图，使用方法：
@@ -206,3 +1348,8 @@ from src.utils.browser import browser
 >>>await browser.shutdown() # 关闭浏览器
 ```
 """
+
+update_notice = PageSnapshot(
+    url="https://jx3.xoyo.com/launcher/update/latest.html", width=130, height=480
+)
+"""更新公告截图，查询更新公告时使用，收到新闻推送和定时任务时在后台刷新"""
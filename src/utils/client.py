@@ -0,0 +1,146 @@
+import asyncio
+from typing import AsyncIterator, Callable, Optional
+
+from httpx import (
+    AsyncBaseTransport,
+    AsyncByteStream,
+    AsyncClient,
+    AsyncHTTPTransport,
+    Limits,
+    Request,
+    Response,
+    Timeout,
+)
+
+from src.config import http_config
+
+from .log import logger
+
+
+class _ReleaseStream(AsyncByteStream):
+    """响应流包装，响应关闭时释放域名并发额度"""
+
+    def __init__(self, stream: AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class _HostLimitTransport(AsyncBaseTransport):
+    """限制单个域名并发请求数的transport"""
+
+    def __init__(self, transport: AsyncBaseTransport, per_host: int):
+        self._transport = transport
+        self._per_host = per_host
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: Request) -> Response:
+        host = request.url.host
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._per_host)
+            self._semaphores[host] = semaphore
+        await semaphore.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            semaphore.release()
+            raise
+        return Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleaseStream(response.stream, semaphore.release),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+_transport: Optional[AsyncBaseTransport] = None
+"""共享的连接池"""
+
+
+def _get_transport() -> AsyncBaseTransport:
+    """获取共享连接池，第一次调用时创建"""
+    global _transport
+    if _transport is None:
+        http2 = http_config.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("<y>未安装h2，HTTP/2已关闭，可以使用 pip install h2 安装</y>")
+                http2 = False
+        limits = Limits(
+            max_connections=http_config.max_connections,
+            max_keepalive_connections=http_config.max_keepalive,
+            keepalive_expiry=http_config.keepalive_expiry,
+        )
+        _transport = AsyncHTTPTransport(limits=limits, http2=http2)
+        if http_config.per_host > 0:
+            _transport = _HostLimitTransport(_transport, http_config.per_host)
+    return _transport
+
+
+class _SharedTransport(AsyncBaseTransport):
+    """共享连接池的引用，单个客户端关闭时不关闭连接池"""
+
+    async def handle_async_request(self, request: Request) -> Response:
+        return await _get_transport().handle_async_request(request)
+
+    async def aclose(self):
+        pass
+
+
+def create_client(**kwargs) -> AsyncClient:
+    """
+    说明:
+        创建使用共享连接池的异步客户端，各客户端可以有自己的headers等设置
+
+    参数:
+        * `**kwargs`：AsyncClient的其他参数
+
+    返回:
+        * `AsyncClient`：异步客户端
+    """
+    kwargs.setdefault(
+        "timeout",
+        Timeout(http_config.read_timeout, connect=http_config.connect_timeout),
+    )
+    return AsyncClient(transport=_SharedTransport(), **kwargs)
+
+
+async def close_client():
+    """
+    说明:
+        关闭共享连接池，在shutdown时使用
+    """
+    global _transport
+    if _transport is not None:
+        await _transport.aclose()
+        _transport = None
+
+
+client = create_client()
+"""
+共享的http客户端，所有请求共用一个连接池，使用方法：
+```
+from src.utils.client import client, create_client
+
+>>>await client.get(url) # 直接使用共享客户端
+>>>my_client = create_client(headers=headers) # 需要单独的headers时，创建自己的客户端
+```
+"""